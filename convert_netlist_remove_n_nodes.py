@@ -2,6 +2,7 @@
 import json
 import re
 import sys
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 def parse_netlist_line(line: str) -> Tuple[str, str, str, str]:   
@@ -46,6 +47,7 @@ def find_measurement_pairs(netlist_lines: List[str]) -> Dict[str, Tuple[str, str
     
     return components, measurement_sources
 
+@lru_cache(maxsize=4096)
 def convert_netlist_remove_n_nodes(netlist: str) -> str:
    
     lines = netlist.split('\n')
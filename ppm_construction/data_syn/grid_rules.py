@@ -1,10 +1,13 @@
 import os
-import json 
+import functools
+import logging
 import numpy as np
 import random
 np.random.seed(42)
 random.seed(42)
 
+logger = logging.getLogger(__name__)
+
                         
 (
     TYPE_SHORT,
@@ -73,6 +76,16 @@ LATEX_TEMPLATES = {
     "v11": v11_latex_template,
 }
 
+def _parse_template(template, markers):
+    parts = []
+    for marker in markers:
+        head, template = template.split(marker, 1)
+        parts.append(head)
+    parts.append(template)
+    return tuple(parts)
+
+_LATEX_TEMPLATE_PARTS = {note: _parse_template(tpl, ("<main>",)) for note, tpl in LATEX_TEMPLATES.items()}
+
 unit_scales = ["", "k", "m", "\\mu", "n", "p"]
 
 LABEL_TYPE_NUMBER, LABEL_TYPE_STRING = tuple(range(2))                                             
@@ -581,9 +594,10 @@ def get_latex_line_draw(x1, y1, x2, y2,
         arrow_offset *= 1.3
     
     if style == "chinese":
-        print(f"drawing between ({x1:.1f},{y1:.1f}) and ({x2:.1f},{y2:.1f}), length={line_length:.2f}\n")
-        print(f"type_num: {type_number}, label_num: {label_subscript}, value: {value}, use_value_annotation: {use_value_annotation}, label_type_number: {label_subscript_type}, direction: {direction}")
-        print(f"measure_type: {measure_type}, measure_label: {measure_label}, measure_direction: {measure_direction}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"drawing between ({x1:.1f},{y1:.1f}) and ({x2:.1f},{y2:.1f}), length={line_length:.2f}\n")
+            logger.debug(f"type_num: {type_number}, label_num: {label_subscript}, value: {value}, use_value_annotation: {use_value_annotation}, label_type_number: {label_subscript_type}, direction: {direction}")
+            logger.debug(f"measure_type: {measure_type}, measure_label: {measure_label}, measure_direction: {measure_direction}")
         type_number = int(type_number)
         
         comp_circuitikz_type = components_latex_info[type_number][0]
@@ -632,7 +646,8 @@ def get_latex_line_draw(x1, y1, x2, y2,
                 elif type_number == TYPE_CCCS or type_number == TYPE_CCVS:
                     labl = f"x_{{ {label_subscript} }} I_{{ {control_label} }}"
 
-        print(f'labl: {labl}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'labl: {labl}')
 
                                             
         if measure_label == -1: measure_label = ""
@@ -652,9 +667,10 @@ def get_latex_line_draw(x1, y1, x2, y2,
                     x1, y1, x2, y2 = x2, y2, x1, y1
             
             if measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[short, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
-            print(f"ret: {ret}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"ret: {ret}")
             return ret
         
                                
@@ -673,7 +689,7 @@ def get_latex_line_draw(x1, y1, x2, y2,
             if not meas_comp_same_direction:
                 x1, y1, x2, y2 = x2, y2, x1, y1
             if measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[rmeter, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
             
             return ret
@@ -793,7 +809,7 @@ def get_latex_line_draw(x1, y1, x2, y2,
             if not meas_comp_same_direction:
                 x1, y1, x2, y2 = x2, y2, x1, y1
             if measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[short, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
             
             return ret
@@ -947,7 +963,7 @@ def get_latex_line_draw(x1, y1, x2, y2,
             if measure_type == MEAS_TYPE_VOLTAGE:
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[open, v{v_plot_extra}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
             elif measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[short, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
                 
             return ret
@@ -1005,7 +1021,7 @@ def get_latex_line_draw(x1, y1, x2, y2,
             if measure_type == MEAS_TYPE_VOLTAGE:
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[open, v{v_plot_extra}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
             elif measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[short, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
                 
             return ret
@@ -1055,7 +1071,7 @@ def get_latex_line_draw(x1, y1, x2, y2,
             if measure_type == MEAS_TYPE_VOLTAGE:
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[open, v{v_plot_extra}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
             elif measure_type == MEAS_TYPE_CURRENT:
-                flow_dir = flow_direction[np.random.choice(range(4))]
+                flow_dir = flow_direction[np.random.randint(len(flow_direction))]
                 ret += f"\\draw ({x1:.1f},{y1:.1f}) to[short, f{flow_dir}=${measure_label}$] ({x2:.1f},{y2:.1f});\n"
                 
             return ret
@@ -1100,43 +1116,38 @@ SPICE_PREFFIX = {
     TYPE_BJT_SMALL_SIGNAL: "X",
     TYPE_MOSFET_SMALL_SIGNAL: "X",
 }
+_SPICE_TEMPLATE_PARTS = {note: _parse_template(tpl, ("{components}", "{simulation}")) for note, tpl in SPICE_TEMPLATES.items()}
 
-def reassign_unique_labels(vcomp_type, hcomp_type, vcomp_label, hcomp_label, m, n):                                              
-    component_counters = {
-        TYPE_RESISTOR: 0,
-        TYPE_CAPACITOR: 0,
-        TYPE_INDUCTOR: 0,
-        TYPE_VOLTAGE_SOURCE: 0,
-        TYPE_CURRENT_SOURCE: 0,
-        TYPE_VCCS: 0,
-        TYPE_VCVS: 0,
-        TYPE_CCCS: 0,
-        TYPE_CCVS: 0,
-        TYPE_OPAMP_INVERTING: 0,
-        TYPE_OPAMP_NONINVERTING: 0,
-        TYPE_OPAMP_BUFFER: 0,
-        TYPE_OPAMP_INTEGRATOR: 0,
-        TYPE_OPAMP_DIFFERENTIATOR: 0,
-        TYPE_OPAMP_SUMMING: 0,
-        TYPE_BJT_SMALL_SIGNAL: 0,
-        TYPE_MOSFET_SMALL_SIGNAL: 0,
-    }
-    
-                                             
-    for ii in range(m-1):
-        for jj in range(n):
-            comp_type = vcomp_type[ii][jj]
-            if comp_type in component_counters:
-                component_counters[comp_type] += 1
-                vcomp_label[ii][jj] = component_counters[comp_type]
-    
-                                               
-    for ii in range(m):
-        for jj in range(n-1):
-            comp_type = hcomp_type[ii][jj]
-            if comp_type in component_counters:
-                component_counters[comp_type] += 1
-                hcomp_label[ii][jj] = component_counters[comp_type]
+_RELABELED_TYPES = np.array([
+    TYPE_RESISTOR,
+    TYPE_CAPACITOR,
+    TYPE_INDUCTOR,
+    TYPE_VOLTAGE_SOURCE,
+    TYPE_CURRENT_SOURCE,
+    TYPE_VCCS,
+    TYPE_VCVS,
+    TYPE_CCCS,
+    TYPE_CCVS,
+    TYPE_OPAMP_INVERTING,
+    TYPE_OPAMP_NONINVERTING,
+    TYPE_OPAMP_BUFFER,
+    TYPE_OPAMP_INTEGRATOR,
+    TYPE_OPAMP_DIFFERENTIATOR,
+    TYPE_OPAMP_SUMMING,
+    TYPE_BJT_SMALL_SIGNAL,
+    TYPE_MOSFET_SMALL_SIGNAL,
+])
+
+def reassign_unique_labels(vcomp_type, hcomp_type, vcomp_label, hcomp_label, m, n):
+    # number each component type 1..k in scan order: vertical edges row-major, then horizontal
+    all_types = np.concatenate((vcomp_type.ravel(), hcomp_type.ravel()))
+    all_labels = np.concatenate((vcomp_label.ravel(), hcomp_label.ravel()))
+    present = all_types[np.isin(all_types, _RELABELED_TYPES)]
+    for comp_type in np.unique(present):
+        mask = all_types == comp_type
+        all_labels[mask] = np.cumsum(mask)[mask]
+    vcomp_label[...] = all_labels[:vcomp_label.size].reshape(vcomp_label.shape)
+    hcomp_label[...] = all_labels[vcomp_label.size:].reshape(hcomp_label.shape)
 
 class Circuit:
 
@@ -1168,32 +1179,33 @@ class Circuit:
         self.vertical_dis = np.arange(m)*4.0 if vertical_dis is None else vertical_dis
         self.horizontal_dis = np.arange(n)*3.0 if horizontal_dis is None else horizontal_dis
 
-        self.has_vedge = np.ones((m-1, n)) if has_vedge is None else has_vedge         
-        self.has_hedge = np.ones((m, n-1)) if has_hedge is None else has_hedge
+        self.has_vedge = np.ones((m-1, n), dtype=int) if has_vedge is None else has_vedge         
+        self.has_hedge = np.ones((m, n-1), dtype=int) if has_hedge is None else has_hedge
+        self._refresh_edge_masks()
 
-        self.vcomp_type = np.zeros((m-1, n)) if vcomp_type is None else vcomp_type
-        self.hcomp_type = np.zeros((m, n-1)) if hcomp_type is None else hcomp_type
-        self.vcomp_label = np.ones((m-1, n)) if vcomp_label is None else vcomp_label
-        self.hcomp_label = np.ones((m, n-1)) if hcomp_label is None else hcomp_label
-        self.vcomp_value = np.zeros((m-1, n)) if vcomp_value is None else vcomp_value
-        self.hcomp_value = np.zeros((m, n-1)) if hcomp_value is None else hcomp_value
-        self.vcomp_value_unit = np.zeros((m-1, n)) if vcomp_value_unit is None else vcomp_value_unit
-        self.hcomp_value_unit = np.zeros((m, n-1)) if hcomp_value_unit is None else hcomp_value_unit
+        self.vcomp_type = np.zeros((m-1, n), dtype=int) if vcomp_type is None else vcomp_type
+        self.hcomp_type = np.zeros((m, n-1), dtype=int) if hcomp_type is None else hcomp_type
+        self.vcomp_label = np.ones((m-1, n), dtype=int) if vcomp_label is None else vcomp_label
+        self.hcomp_label = np.ones((m, n-1), dtype=int) if hcomp_label is None else hcomp_label
+        self.vcomp_value = np.zeros((m-1, n), dtype=int) if vcomp_value is None else vcomp_value
+        self.hcomp_value = np.zeros((m, n-1), dtype=int) if hcomp_value is None else hcomp_value
+        self.vcomp_value_unit = np.zeros((m-1, n), dtype=int) if vcomp_value_unit is None else vcomp_value_unit
+        self.hcomp_value_unit = np.zeros((m, n-1), dtype=int) if hcomp_value_unit is None else hcomp_value_unit
 
-        self.vcomp_direction = np.zeros((m-1, n)) if vcomp_direction is None else vcomp_direction                         
-        self.hcomp_direction = np.zeros((m, n-1)) if hcomp_direction is None else hcomp_direction                         
+        self.vcomp_direction = np.zeros((m-1, n), dtype=int) if vcomp_direction is None else vcomp_direction                         
+        self.hcomp_direction = np.zeros((m, n-1), dtype=int) if hcomp_direction is None else hcomp_direction                         
 
-        self.vcomp_measure = np.zeros((m-1, n)) if vcomp_measure is None else vcomp_measure
-        self.hcomp_measure = np.zeros((m, n-1)) if hcomp_measure is None else hcomp_measure
+        self.vcomp_measure = np.zeros((m-1, n), dtype=int) if vcomp_measure is None else vcomp_measure
+        self.hcomp_measure = np.zeros((m, n-1), dtype=int) if hcomp_measure is None else hcomp_measure
 
-        self.vcomp_measure_label = np.zeros((m-1, n)) if vcomp_measure_label is None else vcomp_measure_label
-        self.hcomp_measure_label = np.zeros((m, n-1)) if hcomp_measure_label is None else hcomp_measure_label
+        self.vcomp_measure_label = np.zeros((m-1, n), dtype=int) if vcomp_measure_label is None else vcomp_measure_label
+        self.hcomp_measure_label = np.zeros((m, n-1), dtype=int) if hcomp_measure_label is None else hcomp_measure_label
 
-        self.vcomp_measure_direction = np.zeros((m-1, n)) if vcomp_measure_direction is None else vcomp_measure_direction
-        self.hcomp_measure_direction = np.zeros((m, n-1)) if hcomp_measure_direction is None else hcomp_measure_direction
+        self.vcomp_measure_direction = np.zeros((m-1, n), dtype=int) if vcomp_measure_direction is None else vcomp_measure_direction
+        self.hcomp_measure_direction = np.zeros((m, n-1), dtype=int) if hcomp_measure_direction is None else hcomp_measure_direction
 
-        self.vcomp_control_meas_label = np.zeros((m-1, n)) if vcomp_control_meas_label is None else vcomp_control_meas_label
-        self.hcomp_control_meas_label = np.zeros((m, n-1)) if hcomp_control_meas_label is None else hcomp_control_meas_label
+        self.vcomp_control_meas_label = np.zeros((m-1, n), dtype=int) if vcomp_control_meas_label is None else vcomp_control_meas_label
+        self.hcomp_control_meas_label = np.zeros((m, n-1), dtype=int) if hcomp_control_meas_label is None else hcomp_control_meas_label
 
         self.use_value_annotation = use_value_annotation                                                                                 
 
@@ -1213,6 +1225,8 @@ class Circuit:
         
         self.note = note
         self.id = id
+        self._spice_template_parts = _SPICE_TEMPLATE_PARTS.get(note)
+        self._latex_template_parts = _LATEX_TEMPLATE_PARTS["v11"]
 
         self._init_degree()                    
         self._check_circuit_valid_by_degree()                                           
@@ -1245,19 +1259,19 @@ class Circuit:
         self.controller_voltage_labels = vol_labels
         self.controller_current_labels = cur_labels
 
+    def _refresh_edge_masks(self):
+        self._vedge_bool = self.has_vedge.astype(bool)
+        self._hedge_bool = self.has_hedge.astype(bool)
+
     def _init_degree(self):
         self.degree = np.zeros((self.m, self.n))
 
-        for i in range(self.m):
-            for j in range(self.n):
-                if j>0:
-                    self.degree[i][j] += (self.has_hedge[i][j-1] and self.hcomp_type[i][j-1] != TYPE_OPEN)
-                if j<self.n-1:
-                    self.degree[i][j] += (self.has_hedge[i][j] and self.hcomp_type[i][j] != TYPE_OPEN)
-                if i>0:
-                    self.degree[i][j] += (self.has_vedge[i-1][j] and self.vcomp_type[i-1][j] != TYPE_OPEN)
-                if i<self.m-1:
-                    self.degree[i][j] += (self.has_vedge[i][j] and self.vcomp_type[i][j] != TYPE_OPEN)
+        v_live = self._vedge_bool & (self.vcomp_type != TYPE_OPEN)
+        h_live = self._hedge_bool & (self.hcomp_type != TYPE_OPEN)
+        self.degree[:, 1:] += h_live
+        self.degree[:, :-1] += h_live
+        self.degree[1:, :] += v_live
+        self.degree[:-1, :] += v_live
 
         self._degree_init = True
     
@@ -1273,10 +1287,10 @@ class Circuit:
             component.append((i, j))
             
                                         
-            if i > 0 and self.has_vedge[i-1][j] and self.vcomp_type[i-1][j] == TYPE_SHORT and self.vcomp_measure[i-1][j] == MEAS_TYPE_NONE: dfs(i-1, j, component)
-            if j > 0 and self.has_hedge[i][j-1] and self.hcomp_type[i][j-1] == TYPE_SHORT and self.hcomp_measure[i][j-1] == MEAS_TYPE_NONE: dfs(i, j-1, component)
-            if i < m-1 and self.has_vedge[i][j] and self.vcomp_type[i][j] == TYPE_SHORT and self.vcomp_measure[i][j] == MEAS_TYPE_NONE: dfs(i+1, j, component)
-            if j < n-1 and self.has_hedge[i][j] and self.hcomp_type[i][j] == TYPE_SHORT and self.hcomp_measure[i][j] == MEAS_TYPE_NONE: dfs(i, j+1, component)
+            if i > 0 and self.has_vedge[i-1, j] and self.vcomp_type[i-1, j] == TYPE_SHORT and self.vcomp_measure[i-1, j] == MEAS_TYPE_NONE: dfs(i-1, j, component)
+            if j > 0 and self.has_hedge[i, j-1] and self.hcomp_type[i, j-1] == TYPE_SHORT and self.hcomp_measure[i, j-1] == MEAS_TYPE_NONE: dfs(i, j-1, component)
+            if i < m-1 and self.has_vedge[i, j] and self.vcomp_type[i, j] == TYPE_SHORT and self.vcomp_measure[i, j] == MEAS_TYPE_NONE: dfs(i+1, j, component)
+            if j < n-1 and self.has_hedge[i, j] and self.hcomp_type[i, j] == TYPE_SHORT and self.hcomp_measure[i, j] == MEAS_TYPE_NONE: dfs(i, j+1, component)
             
         for i in range(m):
             for j in range(n):
@@ -1285,13 +1299,13 @@ class Circuit:
                     dfs(i, j, component)
                     components.append(component)
 
-        print(f"components: {components}")
+        logger.debug("components: %s", components)
                                     
         self.nodes = [f"{i}" for i in range(len(components))]
-        grid_nodes = np.zeros((m, n))               
+        grid_nodes = np.zeros((m, n), dtype=int)
         for i in range(len(components)):
             for x, y in components[i]:
-                grid_nodes[x][y] = i
+                grid_nodes[x, y] = i
         
         return grid_nodes
     
@@ -1322,10 +1336,11 @@ class Circuit:
         self.branches = []
         
         self.grid_nodes = self._get_grid_nodes()
-        print(f"Grid Nodes:\n{self.grid_nodes}\n\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Grid Nodes:\n%s\n\n", self.grid_nodes)
 
-        print("self.hcomp_type: \n", self.hcomp_type)
-        print("self.has_hedge: \n", self.has_hedge)
+            logger.debug("self.hcomp_type: \n%s", self.hcomp_type)
+            logger.debug("self.has_hedge: \n%s", self.has_hedge)
 
         add_order = 0
         for i in range(self.m):
@@ -1333,40 +1348,38 @@ class Circuit:
                 if int(self.note[1:]) <= 9:
                     raise NotImplementedError
                 elif int(self.note[1:]) > 9:
-                    print(f"({i}, {j}) / ({self.m}, {self.n})")
-                    if j < self.n-1 and self.has_hedge[i][j]:
-                        print(f"({i}, {j}) has hedge")
-                        assert self.hcomp_type[i][j] != TYPE_OPEN, f"open circuit should not be in the netlist, {self.hcomp_type[i][j]}"
-                        if self.grid_nodes[i][j] == self.grid_nodes[i][j+1]:
-                            if self.hcomp_type[i][j] != TYPE_SHORT:
+                    if j < self.n-1 and self.has_hedge[i, j]:
+                        assert self.hcomp_type[i, j] != TYPE_OPEN, f"open circuit should not be in the netlist, {self.hcomp_type[i, j]}"
+                        if self.grid_nodes[i, j] == self.grid_nodes[i, j+1]:
+                            if self.hcomp_type[i, j] != TYPE_SHORT:
                                 print("invalid circuit, some components are shorted")
                                 self.valid = False
                                 return False
                         
                         else:
-                            n1 = f"{int(self.grid_nodes[i][j])}"
-                            n2 = f"{int(self.grid_nodes[i][j+1])}"
-                            if self.hcomp_direction[i][j]:
+                            n1 = f"{int(self.grid_nodes[i, j])}"
+                            n2 = f"{int(self.grid_nodes[i, j+1])}"
+                            if self.hcomp_direction[i, j]:
                                 n1, n2 = n2, n1
                             new_branch = {
                                 "n1": n1,
                                 "n2": n2,
-                                "type": self.hcomp_type[i][j],
-                                "label": self.hcomp_label[i][j],
-                                "value": self.hcomp_value[i][j],
-                                "value_unit": self.hcomp_value_unit[i][j],
-                                "measure": self.hcomp_measure[i][j],
-                                "measure_label": self.hcomp_measure_label[i][j],
-                                "meas_comp_same_direction": self.hcomp_measure_direction[i][j] == self.hcomp_direction[i][j],
-                                "control_measure_label": self.hcomp_control_meas_label[i][j],
+                                "type": self.hcomp_type[i, j],
+                                "label": self.hcomp_label[i, j],
+                                "value": self.hcomp_value[i, j],
+                                "value_unit": self.hcomp_value_unit[i, j],
+                                "measure": self.hcomp_measure[i, j],
+                                "measure_label": self.hcomp_measure_label[i, j],
+                                "meas_comp_same_direction": self.hcomp_measure_direction[i, j] == self.hcomp_direction[i, j],
+                                "control_measure_label": self.hcomp_control_meas_label[i, j],
                                 "info": "",
                                 "order": add_order
                             }
 
                             if i == 1 and j == 1:
-                                print(f"new_branch: {new_branch} on [1, 1]")
+                                logger.debug("new_branch: %s on [1, 1]", new_branch)
 
-                            if self._check_conflict_component_measure(self.hcomp_type[i][j], self.hcomp_measure[i][j]):
+                            if self._check_conflict_component_measure(self.hcomp_type[i, j], self.hcomp_measure[i, j]):
                                 print("invalid circuit, conflict between component type and measure type")
                                 self.valid = False
                                 return False
@@ -1374,35 +1387,34 @@ class Circuit:
                             self.branches.append(new_branch)
                             add_order += 1
                     
-                    if i < self.m-1 and self.has_vedge[i][j]:
-                        print(f"({i}, {j}) has vedge")
-                        if self.grid_nodes[i][j] == self.grid_nodes[i+1][j]:
-                            if self.vcomp_type[i][j] != TYPE_SHORT:
+                    if i < self.m-1 and self.has_vedge[i, j]:
+                        if self.grid_nodes[i, j] == self.grid_nodes[i+1, j]:
+                            if self.vcomp_type[i, j] != TYPE_SHORT:
                                 print("invalid circuit, some components are shorted")
                                 self.valid = False
                                 return False
                             
                         else:            
-                            n1 = f"{int(self.grid_nodes[i][j])}"
-                            n2 = f"{int(self.grid_nodes[i+1][j])}"
-                            if self.vcomp_direction[i][j]:
+                            n1 = f"{int(self.grid_nodes[i, j])}"
+                            n2 = f"{int(self.grid_nodes[i+1, j])}"
+                            if self.vcomp_direction[i, j]:
                                 n1, n2 = n2, n1
                             new_branch = {
                                 "n1": n1,
                                 "n2": n2,
-                                "type": self.vcomp_type[i][j],
-                                "label": self.vcomp_label[i][j],
-                                "value": self.vcomp_value[i][j],
-                                "value_unit": self.vcomp_value_unit[i][j],
-                                "measure": self.vcomp_measure[i][j],
-                                "measure_label": self.vcomp_measure_label[i][j],
-                                "meas_comp_same_direction": self.vcomp_measure_direction[i][j] == self.vcomp_direction[i][j],
-                                "control_measure_label": self.vcomp_control_meas_label[i][j],
+                                "type": self.vcomp_type[i, j],
+                                "label": self.vcomp_label[i, j],
+                                "value": self.vcomp_value[i, j],
+                                "value_unit": self.vcomp_value_unit[i, j],
+                                "measure": self.vcomp_measure[i, j],
+                                "measure_label": self.vcomp_measure_label[i, j],
+                                "meas_comp_same_direction": self.vcomp_measure_direction[i, j] == self.vcomp_direction[i, j],
+                                "control_measure_label": self.vcomp_control_meas_label[i, j],
                                 "info": "",
                                 "order": add_order
                             }
 
-                            if self._check_conflict_component_measure(self.vcomp_type[i][j], self.vcomp_measure[i][j]):
+                            if self._check_conflict_component_measure(self.vcomp_type[i, j], self.vcomp_measure[i, j]):
                                 print("invalid circuit, conflict between component type and measure type")
                                 self.valid = False
                                 return False
@@ -1468,13 +1480,12 @@ class Circuit:
                                                                             
             old_neg_idx = int(vs_neg_node_old)
                              
-            self.grid_nodes = self.grid_nodes.astype(int) + 1
+            self.grid_nodes += 1
                                                                                 
             self.grid_nodes[self.grid_nodes == (old_neg_idx + 1)] = 0
 
                                                                          
-            unique_node_ids = sorted(list(set(int(x) for x in self.grid_nodes.flatten().tolist())))
-            self.nodes = [str(i) for i in unique_node_ids]
+            self.nodes = [str(i) for i in np.unique(self.grid_nodes).tolist()]
 
         return True
         pass
@@ -1551,8 +1562,9 @@ class Circuit:
 
                 used_device_names.add(device_name)
 
-                print(br["type"], br["label"], br["n1"], br["n2"], br["value"], br["value_unit"])
-                print(f"Device name: {device_name}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("%s %s %s %s %s %s", br["type"], br["label"], br["n1"], br["n2"], br["value"], br["value_unit"])
+                    logger.debug(f"Device name: {device_name}")
 
                 if br["type"] == TYPE_SHORT:
                     assert br["measure"] == MEAS_TYPE_CURRENT, f"short circuit should be measured by current, {br}"
@@ -1741,7 +1753,8 @@ class Circuit:
                         ms_label_str = str(int(br["measure_label"]))
 
                     if br["measure"] == MEAS_TYPE_VOLTAGE:
-                        print(f"#n1: {br['n1']}, n2: {br['n2']}")
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"#n1: {br['n1']}, n2: {br['n2']}")
                                                                                                                      
                         meas_n1, meas_n2 = br["n1"], br["n2"]
                         if not br["meas_comp_same_direction"]:
@@ -1753,15 +1766,18 @@ class Circuit:
                         else:
                             sim_str += "print v(%s, %s) ; measurement of U%s\n" % (meas_n1, meas_n2, ms_label_str)
                     elif br["measure"] == MEAS_TYPE_CURRENT:
-                        print('#')
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug('#')
                                                                                                                                                             
                         current_meas_counter += 1
                         vmeas_str = f"VI{current_meas_counter}"
                         sim_str += "print i(%s) ; measurement of I%s\n" % (vmeas_str, ms_label_str)
                 sim_str += ".endc\n"
-                print(f"spice_str: {spice_str}, \n\nsim_str: {sim_str}\n\n")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"spice_str: {spice_str}, \n\nsim_str: {sim_str}\n\n")
                         
-                spice_str = SPICE_TEMPLATES[self.note].format(components=spice_str, simulation=sim_str)   
+                prefix, middle, suffix = self._spice_template_parts
+                spice_str = prefix + spice_str + middle + sim_str + suffix
 
             else:                                 
                                                                             
@@ -1783,7 +1799,8 @@ class Circuit:
                         ms_label_str = str(int(br["measure_label"]))
 
                     if br["measure"] == MEAS_TYPE_VOLTAGE:
-                        print(f"#AC voltage measurement: n1: {br['n1']}, n2: {br['n2']}")
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"#AC voltage measurement: n1: {br['n1']}, n2: {br['n2']}")
                         meas_n1, meas_n2 = br["n1"], br["n2"]
                         if not br["meas_comp_same_direction"]:
                             meas_n1, meas_n2 = meas_n2, meas_n1
@@ -1796,7 +1813,8 @@ class Circuit:
                                                                              
                             sim_str += "print vm(%s,%s) vp(%s,%s) ; AC magnitude and phase of U%s\n" % (meas_n1, meas_n2, meas_n1, meas_n2, ms_label_str)
                     elif br["measure"] == MEAS_TYPE_CURRENT:
-                        print('#AC current measurement')
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug('#AC current measurement')
                         current_meas_counter += 1
                         vmeas_str = f"VI{current_meas_counter}"
                                                                           
@@ -1804,8 +1822,10 @@ class Circuit:
                 
                 sim_str += ".endc\n"
                 print(f"AC analysis: freq range {start_freq}Hz to {stop_freq}Hz, {points_per_decade} points/decade")
-                print(f"spice_str: {spice_str}, \n\nsim_str: {sim_str}\n\n")
-                spice_str = SPICE_TEMPLATES[self.note].format(components=spice_str, simulation=sim_str)        
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"spice_str: {spice_str}, \n\nsim_str: {sim_str}\n\n")
+                prefix, middle, suffix = self._spice_template_parts
+                spice_str = prefix + spice_str + middle + sim_str + suffix
         else:
             raise NotImplementedError
 
@@ -1820,7 +1840,7 @@ class Circuit:
         self.valid = True
         for i in range(self.m):
             for j in range(self.n):
-                if self.degree[i][j] == 1:
+                if self.degree[i, j] == 1:
                     print("invalid cricuit")
                     self.valid = False
         
@@ -1831,89 +1851,102 @@ class Circuit:
             print("invalid circuit")
 
     def _draw_vertical_edge(self, i, j):
-        if ((i>=0 and i<self.m-1) and (j>=0 and j<self.n)) and self.has_vedge[i][j]:
-            if int(self.note[1:]) < 9:               
-                raise NotImplementedError
-            else:
-                                                                               
-                v_meas_type = self.vcomp_measure[i][j]
-                v_meas_label = self.vcomp_measure_label[i][j]
-                show_meas = (
-                    (v_meas_type == MEAS_TYPE_VOLTAGE and int(v_meas_label) in self.controller_voltage_labels) or
-                    (v_meas_type == MEAS_TYPE_CURRENT and int(v_meas_label) in self.controller_current_labels)
-                )
-                new_line = get_latex_line_draw(self.horizontal_dis[j], self.vertical_dis[i], self.horizontal_dis[j], self.vertical_dis[i+1],
-                                                self.vcomp_type[i][j], 
-                                                self.vcomp_label[i][j], 
-                                                self.vcomp_value[i][j], 
-                                                self.vcomp_value_unit[i][j],
-                                                self.use_value_annotation,
-                                                measure_type=(v_meas_type if show_meas else MEAS_TYPE_NONE), 
-                                                measure_label=(v_meas_label if show_meas else -1),
-                                                measure_direction=self.vcomp_measure_direction[i][j],
-                                                direction=self.vcomp_direction[i][j],
-                                                label_subscript_type=int(not self.label_numerical_subscript),
-                                                control_label=self.vcomp_control_meas_label[i][j],
-                                                note=self.note,
-                                                analysis_type=getattr(self, 'analysis_type', 'dc_analysis')
-                                            )
-            return new_line
+        if ((i>=0 and i<self.m-1) and (j>=0 and j<self.n)) and self.has_vedge[i, j]:
+            return self._draw_vertical_edge_body(i, j)
         else:
             return ""
-        
+
+    def _draw_vertical_edge_body(self, i, j):
+        if int(self.note[1:]) < 9:               
+            raise NotImplementedError
+        else:
+                                                                           
+            v_meas_type = self.vcomp_measure[i, j]
+            v_meas_label = self.vcomp_measure_label[i, j]
+            show_meas = (
+                (v_meas_type == MEAS_TYPE_VOLTAGE and int(v_meas_label) in self.controller_voltage_labels) or
+                (v_meas_type == MEAS_TYPE_CURRENT and int(v_meas_label) in self.controller_current_labels)
+            )
+            new_line = get_latex_line_draw(self.horizontal_dis[j], self.vertical_dis[i], self.horizontal_dis[j], self.vertical_dis[i+1],
+                                            self.vcomp_type[i, j], 
+                                            self.vcomp_label[i, j], 
+                                            self.vcomp_value[i, j], 
+                                            self.vcomp_value_unit[i, j],
+                                            self.use_value_annotation,
+                                            measure_type=(v_meas_type if show_meas else MEAS_TYPE_NONE), 
+                                            measure_label=(v_meas_label if show_meas else -1),
+                                            measure_direction=self.vcomp_measure_direction[i, j],
+                                            direction=self.vcomp_direction[i, j],
+                                            label_subscript_type=int(not self.label_numerical_subscript),
+                                            control_label=self.vcomp_control_meas_label[i, j],
+                                            note=self.note,
+                                            analysis_type=getattr(self, 'analysis_type', 'dc_analysis')
+                                        )
+        return new_line
+    
     def _draw_horizontal_edge(self, i, j):
-        if ((i>=0 and i<self.m) and (j>=0 and j<self.n-1)) and self.has_hedge[i][j]:
-            if int(self.note[1:]) < 9:               
-                raise NotImplementedError
-            else:
-                                                                               
-                h_meas_type = self.hcomp_measure[i][j]
-                h_meas_label = self.hcomp_measure_label[i][j]
-                show_meas = (
-                    (h_meas_type == MEAS_TYPE_VOLTAGE and int(h_meas_label) in self.controller_voltage_labels) or
-                    (h_meas_type == MEAS_TYPE_CURRENT and int(h_meas_label) in self.controller_current_labels)
-                )
-                new_line = get_latex_line_draw(self.horizontal_dis[j], self.vertical_dis[i], self.horizontal_dis[j+1], self.vertical_dis[i],
-                                                self.hcomp_type[i][j], 
-                                                self.hcomp_label[i][j], 
-                                                self.hcomp_value[i][j],
-                                                self.hcomp_value_unit[i][j],
-                                                self.use_value_annotation,
-                                                measure_type=(h_meas_type if show_meas else MEAS_TYPE_NONE), 
-                                                measure_label=(h_meas_label if show_meas else -1),
-                                                measure_direction=self.hcomp_measure_direction[i][j],
-                                                direction=self.hcomp_direction[i][j],
-                                                label_subscript_type=int(not self.label_numerical_subscript),
-                                                control_label=self.hcomp_control_meas_label[i][j],
-                                                note=self.note,
-                                                analysis_type=getattr(self, 'analysis_type', 'dc_analysis')
-                                            )
-            return new_line
+        if ((i>=0 and i<self.m) and (j>=0 and j<self.n-1)) and self.has_hedge[i, j]:
+            return self._draw_horizontal_edge_body(i, j)
         else: 
             return ""
-        
+
+    def _draw_horizontal_edge_body(self, i, j):
+        if int(self.note[1:]) < 9:               
+            raise NotImplementedError
+        else:
+                                                                           
+            h_meas_type = self.hcomp_measure[i, j]
+            h_meas_label = self.hcomp_measure_label[i, j]
+            show_meas = (
+                (h_meas_type == MEAS_TYPE_VOLTAGE and int(h_meas_label) in self.controller_voltage_labels) or
+                (h_meas_type == MEAS_TYPE_CURRENT and int(h_meas_label) in self.controller_current_labels)
+            )
+            new_line = get_latex_line_draw(self.horizontal_dis[j], self.vertical_dis[i], self.horizontal_dis[j+1], self.vertical_dis[i],
+                                            self.hcomp_type[i, j], 
+                                            self.hcomp_label[i, j], 
+                                            self.hcomp_value[i, j],
+                                            self.hcomp_value_unit[i, j],
+                                            self.use_value_annotation,
+                                            measure_type=(h_meas_type if show_meas else MEAS_TYPE_NONE), 
+                                            measure_label=(h_meas_label if show_meas else -1),
+                                            measure_direction=self.hcomp_measure_direction[i, j],
+                                            direction=self.hcomp_direction[i, j],
+                                            label_subscript_type=int(not self.label_numerical_subscript),
+                                            control_label=self.hcomp_control_meas_label[i, j],
+                                            note=self.note,
+                                            analysis_type=getattr(self, 'analysis_type', 'dc_analysis')
+                                        )
+        return new_line
+    
     def to_latex(self):
                                                                 
                                        
         if int(self.note[1:]) <= 9:
             raise NotImplementedError
         elif int(self.note[1:]) > 9:
-            latex_template = LATEX_TEMPLATES["v11"]
+            latex_prefix, latex_suffix = self._latex_template_parts
         else:
             raise NotImplementedError
         
-        latex_code_main = ""
-        for i in range(self.m):
-            for j in range(self.n):
-                latex_code_main += self._draw_horizontal_edge(i,j)
-                latex_code_main += self._draw_vertical_edge(i,j)
+        # Keep the per-cell (horizontal, then vertical) drawing order of a full grid scan
+        h_cells = np.zeros((self.m, self.n), dtype=bool)
+        v_cells = np.zeros((self.m, self.n), dtype=bool)
+        h_cells[:, :-1] = self._hedge_bool
+        v_cells[:-1, :] = self._vedge_bool
+        latex_code_main_parts = []
+        for i, j in np.argwhere(h_cells | v_cells):
+            if h_cells[i, j]:
+                latex_code_main_parts.append(self._draw_horizontal_edge_body(i, j))
+            if v_cells[i, j]:
+                latex_code_main_parts.append(self._draw_vertical_edge_body(i, j))
+        latex_code_main = "".join(latex_code_main_parts)
         
                                                               
                                                                                     
         node_label_code = ""
         for i in range(self.m):
             for j in range(self.n):
-                node_num = int(self.grid_nodes[i][j])
+                node_num = int(self.grid_nodes[i, j])
                 x_coord = self.horizontal_dis[j]
                 y_coord = self.vertical_dis[i]
                 
@@ -1921,13 +1954,13 @@ class Circuit:
                 is_connected = False
                 
                                                                  
-                if i > 0 and self.has_vedge[i-1][j]:              
+                if i > 0 and self.has_vedge[i-1, j]:              
                     is_connected = True
-                if i < self.m-1 and self.has_vedge[i][j]:                
+                if i < self.m-1 and self.has_vedge[i, j]:                
                     is_connected = True
-                if j > 0 and self.has_hedge[i][j-1]:                
+                if j > 0 and self.has_hedge[i, j-1]:                
                     is_connected = True
-                if j < self.n-1 and self.has_hedge[i][j]:                 
+                if j < self.n-1 and self.has_hedge[i, j]:                 
                     is_connected = True
                 
                 if is_connected:
@@ -1935,7 +1968,7 @@ class Circuit:
                     node_label_code += f"\\node[circle, draw=blue, fill=white, inner sep=2pt] at ({x_coord:.1f},{y_coord:.1f}) {{\\textcolor{{blue}}{{\\tiny {node_num}}}}};\n"
         
         latex_code_main += node_label_code
-        latex_code = latex_template.replace("<main>", latex_code_main)
+        latex_code = latex_prefix + latex_code_main + latex_suffix
         
         if int(self.note[1:]) >= 8:
             latex_code = latex_code.replace("<font>", self.latex_font_size)
@@ -1952,22 +1985,22 @@ class Circuit:
         
         for i in range(self.m-1):
             for j in range(self.n):
-                if self.has_vedge[i][j]:
-                    if self.vcomp_measure[i][j] != MEAS_TYPE_NONE:
+                if self.has_vedge[i, j]:
+                    if self.vcomp_measure[i, j] != MEAS_TYPE_NONE:
                         measurement_count += 1
-                    if self.vcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
+                    if self.vcomp_type[i, j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
                         complex_component_count += 1
-                    if self.vcomp_type[i][j] == TYPE_OPAMP_INTEGRATOR:
+                    if self.vcomp_type[i, j] == TYPE_OPAMP_INTEGRATOR:
                         integrator_count += 1                                             
                         
         for i in range(self.m):
             for j in range(self.n-1):
-                if self.has_hedge[i][j]:
-                    if self.hcomp_measure[i][j] != MEAS_TYPE_NONE:
+                if self.has_hedge[i, j]:
+                    if self.hcomp_measure[i, j] != MEAS_TYPE_NONE:
                         measurement_count += 1
-                    if self.hcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
+                    if self.hcomp_type[i, j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
                         complex_component_count += 1
-                    if self.hcomp_type[i][j] == TYPE_OPAMP_INTEGRATOR:
+                    if self.hcomp_type[i, j] == TYPE_OPAMP_INTEGRATOR:
                         integrator_count += 1                                             
         
                                                            
@@ -2003,16 +2036,16 @@ class Circuit:
         
         for i in range(self.m-1):
             for j in range(self.n):
-                if self.has_vedge[i][j] and self.vcomp_type[i][j] != TYPE_OPEN:
+                if self.has_vedge[i, j] and self.vcomp_type[i, j] != TYPE_OPEN:
                     total_components += 1
-                    if self.vcomp_measure[i][j] != MEAS_TYPE_NONE:
+                    if self.vcomp_measure[i, j] != MEAS_TYPE_NONE:
                         total_measurements += 1
                         
         for i in range(self.m):
             for j in range(self.n-1):
-                if self.has_hedge[i][j] and self.hcomp_type[i][j] != TYPE_OPEN:
+                if self.has_hedge[i, j] and self.hcomp_type[i, j] != TYPE_OPEN:
                     total_components += 1
-                    if self.hcomp_measure[i][j] != MEAS_TYPE_NONE:
+                    if self.hcomp_measure[i, j] != MEAS_TYPE_NONE:
                         total_measurements += 1
         
                            
@@ -2043,39 +2076,39 @@ class Circuit:
                                                                                  
         for i in range(self.m-1):
             for j in range(self.n):
-                if self.has_vedge[i][j]:
+                if self.has_vedge[i, j]:
                     component_complexity = 0
-                    if self.vcomp_measure[i][j] != MEAS_TYPE_NONE:
-                        measurement_map[i][j] = self.vcomp_measure[i][j]
-                        measurement_map[i+1][j] = self.vcomp_measure[i][j]                       
+                    if self.vcomp_measure[i, j] != MEAS_TYPE_NONE:
+                        measurement_map[i, j] = self.vcomp_measure[i, j]
+                        measurement_map[i+1, j] = self.vcomp_measure[i, j]                       
                         component_complexity += 0.5
-                    if self.vcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
-                        controlled_source_map[i][j] = 1
-                        controlled_source_map[i+1][j] = 1                       
+                    if self.vcomp_type[i, j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
+                        controlled_source_map[i, j] = 1
+                        controlled_source_map[i+1, j] = 1                       
                         component_complexity += 1.0                                          
-                    if self.vcomp_type[i][j] in [TYPE_VOLTAGE_SOURCE, TYPE_CURRENT_SOURCE]:
+                    if self.vcomp_type[i, j] in [TYPE_VOLTAGE_SOURCE, TYPE_CURRENT_SOURCE]:
                         component_complexity += 0.3                                       
                     
-                    component_complexity_map[i][j] += component_complexity
-                    component_complexity_map[i+1][j] += component_complexity
+                    component_complexity_map[i, j] += component_complexity
+                    component_complexity_map[i+1, j] += component_complexity
                         
         for i in range(self.m):
             for j in range(self.n-1):
-                if self.has_hedge[i][j]:
+                if self.has_hedge[i, j]:
                     component_complexity = 0
-                    if self.hcomp_measure[i][j] != MEAS_TYPE_NONE:
-                        measurement_map[i][j] = self.hcomp_measure[i][j]
-                        measurement_map[i][j+1] = self.hcomp_measure[i][j]                       
+                    if self.hcomp_measure[i, j] != MEAS_TYPE_NONE:
+                        measurement_map[i, j] = self.hcomp_measure[i, j]
+                        measurement_map[i, j+1] = self.hcomp_measure[i, j]                       
                         component_complexity += 0.5
-                    if self.hcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
-                        controlled_source_map[i][j] = 1
-                        controlled_source_map[i][j+1] = 1                       
+                    if self.hcomp_type[i, j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
+                        controlled_source_map[i, j] = 1
+                        controlled_source_map[i, j+1] = 1                       
                         component_complexity += 1.0                                          
-                    if self.hcomp_type[i][j] in [TYPE_VOLTAGE_SOURCE, TYPE_CURRENT_SOURCE]:
+                    if self.hcomp_type[i, j] in [TYPE_VOLTAGE_SOURCE, TYPE_CURRENT_SOURCE]:
                         component_complexity += 0.3                                       
                     
-                    component_complexity_map[i][j] += component_complexity
-                    component_complexity_map[i][j+1] += component_complexity
+                    component_complexity_map[i, j] += component_complexity
+                    component_complexity_map[i, j+1] += component_complexity
         
                                                                                   
         conflict_resolved = 0
@@ -2093,11 +2126,11 @@ class Circuit:
                         ni, nj = i + di, j + dj
                         if 0 <= ni < self.m and 0 <= nj < self.n:
                             weight = 1.0 / (abs(di) + abs(dj) + 1)                     
-                            if measurement_map[ni][nj] > 0:
+                            if measurement_map[ni, nj] > 0:
                                 local_measurements += weight
-                            if controlled_source_map[ni][nj] > 0:
+                            if controlled_source_map[ni, nj] > 0:
                                 local_controlled += weight
-                            local_complexity += component_complexity_map[ni][nj] * weight
+                            local_complexity += component_complexity_map[ni, nj] * weight
                 
                                                                           
                 if (local_measurements > 1.5 and local_controlled > 0.5) or local_complexity > 2.0:
@@ -2121,52 +2154,149 @@ class Circuit:
                 edges_to_check.append(('h', i, j))
             
             for edge_type, ei, ej in edges_to_check:
-                if edge_type == 'v' and self.has_vedge[ei][ej]:
+                if edge_type == 'v' and self.has_vedge[ei, ej]:
                                                                                                      
-                    if (self.vcomp_type[ei][ej] in [TYPE_VCCS, TYPE_CCCS] and 
-                        self.vcomp_measure[ei][ej] == MEAS_TYPE_CURRENT):
-                        self.vcomp_measure[ei][ej] = MEAS_TYPE_NONE
-                        self.vcomp_measure_label[ei][ej] = -1
+                    if (self.vcomp_type[ei, ej] in [TYPE_VCCS, TYPE_CCCS] and 
+                        self.vcomp_measure[ei, ej] == MEAS_TYPE_CURRENT):
+                        self.vcomp_measure[ei, ej] = MEAS_TYPE_NONE
+                        self.vcomp_measure_label[ei, ej] = -1
                         conflict_resolved += 1
                         print(f"Removed current measurement from controlled source at vedge ({ei},{ej})")
-                elif edge_type == 'h' and self.has_hedge[ei][ej]:
+                elif edge_type == 'h' and self.has_hedge[ei, ej]:
                                                                                                      
-                    if (self.hcomp_type[ei][ej] in [TYPE_VCCS, TYPE_CCCS] and 
-                        self.hcomp_measure[ei][ej] == MEAS_TYPE_CURRENT):
-                        self.hcomp_measure[ei][ej] = MEAS_TYPE_NONE
-                        self.hcomp_measure_label[ei][ej] = -1
+                    if (self.hcomp_type[ei, ej] in [TYPE_VCCS, TYPE_CCCS] and 
+                        self.hcomp_measure[ei, ej] == MEAS_TYPE_CURRENT):
+                        self.hcomp_measure[ei, ej] = MEAS_TYPE_NONE
+                        self.hcomp_measure_label[ei, ej] = -1
                         conflict_resolved += 1
                         print(f"Removed current measurement from controlled source at hedge ({ei},{ej})")
         
         print(f"Advanced measurement placement optimized: {conflict_resolved} potential conflicts resolved")
         print(f"Identified {len(high_conflict_areas)} high-conflict areas")
 
-def gen_circuit(note="v1", id="", symbolic=False, simple_circuits=False, integrator=False, rlc=False, no_meas=False):
-               
-    if int(note[1:]) != 11:
-        raise NotImplementedError
-    
-    # v11 generation
-
+def _make_rng():
+    # seeded from the legacy global state so np.random.seed() keeps generation reproducible
+    return np.random.default_rng(np.random.randint(0, 2**31 - 1))
+
+def _draw_edge_types(rng, is_outer, comp_lut, comp_lut_outer):
+    shape = is_outer.shape
+    return np.where(is_outer,
+                    comp_lut_outer[rng.integers(0, comp_lut_outer.size, size=shape)],
+                    comp_lut[rng.integers(0, comp_lut.size, size=shape)])
+
+def _draw_edge_samples(rng, shape, meas_lut, meas_label_lut, meas_dir_prob):
+    meas_draws = meas_lut[rng.integers(0, meas_lut.size, size=shape)]
+    meas_label_draws = meas_label_lut[rng.integers(0, meas_label_lut.size, size=shape)]
+    dir_draws = (rng.random(shape) < meas_dir_prob).astype(np.int8)
+    return meas_draws, meas_label_draws, dir_draws
+
+def _count_dep_sources(type_draws):
+    num_vc = np.count_nonzero((type_draws == TYPE_VCCS) | (type_draws == TYPE_VCVS))
+    num_ic = np.count_nonzero((type_draws == TYPE_CCCS) | (type_draws == TYPE_CCVS))
+    return num_vc, num_ic
+
+def _fill_edges(comp_type, comp_value, comp_value_unit, comp_label, comp_measure, comp_measure_label,
+                comp_direction, has_edge, type_draws, meas_draws, meas_label_draws, dir_draws,
+                comp_mean_value, comp_max_value, unit_choices, rng, comp_cnt):
+    comp_type[...] = type_draws
+    is_open = type_draws == TYPE_OPEN
+    is_vc = (type_draws == TYPE_VCCS) | (type_draws == TYPE_VCVS)
+    is_ic = (type_draws == TYPE_CCCS) | (type_draws == TYPE_CCVS)
+    is_plain = ~(is_open | is_vc | is_ic)
+
+    has_edge[is_open] = 0
+    comp_measure[...] = np.where(is_plain, meas_draws, MEAS_TYPE_NONE)
+    comp_measure_label[...] = np.where(is_plain, meas_label_draws, np.where(is_open, 0, -1))
+    comp_direction[...] = np.where(is_open, 0, dir_draws)
+
+    # running per-type labels continue from comp_cnt, in row-major order:
+    # a stable sort groups each type, and the offset from its group start is the rank
+    live_types = type_draws[~is_open].astype(np.intp)
+    order = np.argsort(live_types, kind="stable")
+    sorted_types = live_types[order]
+    rank = np.arange(1, sorted_types.size + 1) - np.searchsorted(sorted_types, sorted_types, side="left")
+    live_labels = np.empty(live_types.shape, dtype=np.int64)
+    live_labels[order] = comp_cnt[sorted_types] + rank
+    comp_cnt += np.bincount(live_types, minlength=comp_cnt.size)
+    comp_label[~is_open] = live_labels
+
+    values = rng.integers(comp_mean_value[type_draws], comp_max_value[type_draws])
+    comp_value[...] = np.where(is_open, 0, values)
+    units = unit_choices[rng.integers(0, unit_choices.size, size=type_draws.shape)]
+    comp_value_unit[...] = np.where(is_open, 0, units)
+
+def _demote_extras_to_resistor(vcomp_type, hcomp_type, vcomp_value, hcomp_value, v_pos, h_pos,
+                               comp_mean_value, comp_max_value, rng, name):
+    # keep the first hit in scan order (vertical edges first), demote the rest
+    if v_pos.shape[0] > 0:
+        v_pos = v_pos[1:]
+    else:
+        h_pos = h_pos[1:]
+    for comp_type, comp_value, pos in ((vcomp_type, vcomp_value, v_pos), (hcomp_type, hcomp_value, h_pos)):
+        comp_type[pos[:, 0], pos[:, 1]] = TYPE_RESISTOR
+        comp_value[pos[:, 0], pos[:, 1]] = rng.integers(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR], size=pos.shape[0])
+    if logger.isEnabledFor(logging.DEBUG):
+        for ii, jj in v_pos:
+            logger.debug(f"Demoted extra {name} at vedge ({ii},{jj}) to resistor")
+        for ii, jj in h_pos:
+            logger.debug(f"Demoted extra {name} at hedge ({ii},{jj}) to resistor")
+
+def _resistor_edges(has_vedge, vcomp_type, has_hedge, hcomp_type):
+    v_idx = np.argwhere(has_vedge.view(bool) & (vcomp_type == TYPE_RESISTOR))
+    h_idx = np.argwhere(has_hedge.view(bool) & (hcomp_type == TYPE_RESISTOR))
+    return v_idx, h_idx
+
+def _pick_edge(rng, v_idx, h_idx):
+    # uniform over the vertical candidates followed by the horizontal ones
+    total = v_idx.shape[0] + h_idx.shape[0]
+    if total == 0:
+        return None
+    k = int(rng.integers(total))
+    if k < v_idx.shape[0]:
+        return ('v', *v_idx[k])
+    return ('h', *h_idx[k - v_idx.shape[0]])
+
+# [low, high) value range per component type id, gathered as comp_mean_value[type_grid]
+_COMP_MEAN_VALUE = np.array([1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10], dtype=np.int64)
+_COMP_MAX_VALUE = np.array([100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 50, 50, 1, 10, 10, 50, 100], dtype=np.int64)
+_COMP_MEAN_VALUE.setflags(write=False)
+_COMP_MAX_VALUE.setflags(write=False)
+
+# unit, measurement-type and measurement-label pools, sampled with rng.integers over their length
+_UNIT_CHOICES = np.array([UNIT_MODE_1], dtype=np.int32)
+_MEAS_CHOICES = np.repeat(np.array([MEAS_TYPE_NONE, MEAS_TYPE_VOLTAGE, MEAS_TYPE_CURRENT], dtype=np.int32), [20, 1, 1])
+_MEAS_LABEL_CHOICES = np.arange(-1, 10, dtype=np.int32)
+_UNIT_CHOICES.setflags(write=False)
+_MEAS_CHOICES.setflags(write=False)
+_MEAS_LABEL_CHOICES.setflags(write=False)
+
+# per-edge fields of the gen_circuit scratch grids, each at the narrowest dtype that holds it
+_EDGE_DTYPE = np.dtype([
+    ("type", np.int8),
+    ("label", np.int16),
+    ("value", np.int16),
+    ("value_unit", np.uint8),
+    ("direction", np.uint8),
+    ("measure", np.uint8),
+    ("measure_label", np.int16),
+    ("measure_direction", np.uint8),
+    ("control_meas_label", np.int16),
+], align=True)
+
+@functools.lru_cache(maxsize=None)
+def _build_luts(note, simple_circuits):
                                             
     if simple_circuits:
                                                         
         num_grid_options = [2, 3, 4]
         num_grid_dis =     [8, 6, 1]                                   
-                                                                        
-        num_comp_dis = [8, 3, 0, 8, 2, 1, 4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8]                                                         
-        num_comp_dis_outer = [6, 3, 0, 6, 1, 1, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 6]                                       
     else:
                                         
         num_grid_options = [2, 3, 4, 5, 6, 7, 8]
         num_grid_dis =     [6, 8, 2, 0, 0, 0, 0]                                                    
-                                                                        
-        num_comp_dis = [10, 4, 0, 10, 3, 3, 6, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 10]                                                         
-        num_comp_dis_outer = [8, 4, 0, 8, 2, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8]                                   
     
-    num_grid_choices = []
-    for op, dis in zip(num_grid_options, num_grid_dis):
-        num_grid_choices += [op]*dis
+    num_grid_options = np.asarray(num_grid_options, dtype=np.int64)
+    num_grid_counts = np.asarray(num_grid_dis, dtype=np.float64)
 
                                                                                                                                     
                                                                                                                     
@@ -2175,257 +2305,177 @@ def gen_circuit(note="v1", id="", symbolic=False, simple_circuits=False, integra
                                                                                                                                             
     num_comp_dis_outer = [10, 4, 0, 10, 1, 1, 0, 3, 3, 2, 1, 0, 0, 0, 0, 0, 0]                                     
 
-    num_comp_choices = []
-    num_comp_choices_outer = []
-                                                                                    
-    for op, dis in zip(range(18), num_comp_dis):
-        num_comp_choices += [op]*dis
-    for op, dis in zip(range(18), num_comp_dis_outer):
-        num_comp_choices_outer += [op]*dis
+    num_comp_lut = np.repeat(np.arange(len(num_comp_dis), dtype=np.int64), num_comp_dis)
+    num_comp_lut_outer = np.repeat(np.arange(len(num_comp_dis_outer), dtype=np.int64), num_comp_dis_outer)
 
-    vertical_dis_mean, vertical_dis_std = 4.0, 0.4                                              
-    horizontal_dis_mean, horizontal_dis_std = 4.0, 0.4                                              
 
-                                                                            
-    comp_mean_value = [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10]                            
-    comp_max_value = [100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 50, 50, 1, 10, 10, 50, 100]                       
+    luts = (num_grid_options, num_grid_counts, num_comp_lut, num_comp_lut_outer)
+    for lut in luts:
+        lut.setflags(write=False)
+    return luts
 
-                                                                    
-    unit_choices = [UNIT_MODE_1]                                   
+def gen_circuit(note="v1", id="", symbolic=False, simple_circuits=False, integrator=False, rlc=False, no_meas=False):
+               
+    if int(note[1:]) != 11:
+        raise NotImplementedError
+    
+    # v11 generation
 
-    meas_dis = [20, 1, 1]                                                            
-    meas_choices = [MEAS_TYPE_NONE]*meas_dis[0] + [MEAS_TYPE_VOLTAGE]*meas_dis[1] + [MEAS_TYPE_CURRENT]*meas_dis[2]
-    meas_dir_prob = 0.5
+    num_grid_options, num_grid_counts, num_comp_lut, num_comp_lut_outer = _build_luts(note, simple_circuits)
+    num_grid_counts = num_grid_counts.copy()
+    comp_mean_value, comp_max_value = _COMP_MEAN_VALUE, _COMP_MAX_VALUE
+    meas_lut, meas_label_lut, unit_choices = _MEAS_CHOICES, _MEAS_LABEL_CHOICES, _UNIT_CHOICES
 
-    meas_label_choices = range(-1, 10)
+    vertical_dis_mean, vertical_dis_std = 4.0, 0.4                                              
+    horizontal_dis_mean, horizontal_dis_std = 4.0, 0.4                                              
+    meas_dir_prob = 0.5
 
     use_value_annotation_prob = 0.9                                                            
 
                     
-    m = np.random.choice(num_grid_choices)
+    rng = _make_rng()
+
+    m = rng.choice(num_grid_options, p=num_grid_counts / num_grid_counts.sum())
     if m == 4:
-        num_grid_choices.remove(4)
-    n = np.random.choice(num_grid_choices)
-    vertical_dis = np.arange(m)* vertical_dis_mean + np.random.uniform(-vertical_dis_std, vertical_dis_std, size=(m,))
-    horizontal_dis = np.arange(n)* horizontal_dis_mean + np.random.uniform(-horizontal_dis_std, horizontal_dis_std, size=(n,))
+        # a 4-row grid takes one weight unit away from a 4-column grid
+        num_grid_counts[num_grid_options == 4] -= 1
+    n = rng.choice(num_grid_options, p=num_grid_counts / num_grid_counts.sum())
+    vertical_dis = np.arange(m)* vertical_dis_mean + rng.uniform(-vertical_dis_std, vertical_dis_std, size=(m,))
+    horizontal_dis = np.arange(n)* horizontal_dis_mean + rng.uniform(-horizontal_dis_std, horizontal_dis_std, size=(n,))
+
+    # outer columns (vertical edges) / outer rows (horizontal edges) use their own distribution
+    v_outer = np.zeros((m-1, n), dtype=bool)
+    v_outer[:, [0, -1]] = True
+    h_outer = np.zeros((m, n-1), dtype=bool)
+    h_outer[[0, -1], :] = True
+
+    has_vedge = np.ones((m-1, n), dtype=np.uint8)
+    has_hedge = np.ones((m, n-1), dtype=np.uint8)
+
+    # one structured buffer per orientation; the per-field grids below are views into it
+    vedges = np.zeros((m-1, n), dtype=_EDGE_DTYPE)
+    hedges = np.zeros((m, n-1), dtype=_EDGE_DTYPE)
+    (vcomp_type, vcomp_label, vcomp_value, vcomp_value_unit, vcomp_direction, vcomp_measure,
+     vcomp_measure_label, vcomp_measure_direction, vcomp_control_meas_label) = (vedges[f] for f in _EDGE_DTYPE.names)
+    (hcomp_type, hcomp_label, hcomp_value, hcomp_value_unit, hcomp_direction, hcomp_measure,
+     hcomp_measure_label, hcomp_measure_direction, hcomp_control_meas_label) = (hedges[f] for f in _EDGE_DTYPE.names)
+
+    comp_cnt = np.zeros(_COMP_MEAN_VALUE.size, dtype=np.int64)
+    edge_flags = (has_vedge, has_hedge)
+    scratch = (vedges, hedges, comp_cnt)
 
     while True:
 
-                                    
-        has_vedge = np.ones((m-1, n), dtype=int)
-        has_hedge = np.ones((m, n-1), dtype=int)
-
-        vcomp_type = np.zeros((m-1, n), dtype=int)
-        hcomp_type = np.zeros((m, n-1), dtype=int)
-        vcomp_label = np.zeros((m-1, n))
-        hcomp_label = np.zeros((m, n-1))
-        vcomp_value = np.zeros((m-1, n))
-        hcomp_value = np.zeros((m, n-1))
-
-        vcomp_value_unit = np.zeros((m-1, n), dtype=int)
-        hcomp_value_unit = np.zeros((m, n-1), dtype=int)
-
-        vcomp_direction = np.zeros((m-1, n), dtype=int)         
-        hcomp_direction = np.zeros((m, n-1), dtype=int)         
-
-        vcomp_measure = np.zeros((m-1, n), dtype=int)
-        hcomp_measure = np.zeros((m, n-1), dtype=int)
-
-        vcomp_measure_label = np.zeros((m-1, n))
-        hcomp_measure_label = np.zeros((m, n-1))
-
-        vcomp_measure_direction = np.zeros((m-1, n), dtype=int)         
-        hcomp_measure_direction = np.zeros((m, n-1), dtype=int)         
-
-        vcomp_control_meas_label = np.zeros((m-1, n))   
-        hcomp_control_meas_label = np.zeros((m, n-1))
-
-                            
-        comp_cnt = [0] * 18                                                 
-        meas_label_stat = {
-            MEAS_TYPE_NONE: [],
-            MEAS_TYPE_VOLTAGE: [],
-            MEAS_TYPE_CURRENT: []
-        }
-
-                                            
-        VC_sources = {'v': [], 'h': []}
-        IC_sources = {'v': [], 'h': []}
-        print(f"has_vedge: {has_vedge}\n\nhas_hedge: {has_hedge}")
-
-        for i in range(m-1):
-            for j in range(n):
-                if j == 0 or j == n-1:
-                    vcomp_type[i][j] = np.random.choice(num_comp_choices_outer)
-                else:
-                    vcomp_type[i][j] = np.random.choice(num_comp_choices)
-
-                if vcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS]:
-                    VC_sources["v"].append((i, j))
-                if vcomp_type[i][j] in [TYPE_CCCS, TYPE_CCVS]:
-                    IC_sources["v"].append((i, j))
-                if vcomp_type[i][j] == TYPE_OPEN:
-                    has_vedge[i][j] = 0
-                    continue
-
-                vcomp_value[i][j] = np.random.randint(comp_mean_value[vcomp_type[i][j]], comp_max_value[vcomp_type[i][j]])
-                vcomp_value_unit[i][j] = np.random.choice(unit_choices)
-
-                comp_cnt[vcomp_type[i][j]] += 1
-                vcomp_label[i][j] = comp_cnt[vcomp_type[i][j]]
-
-                                                                        
-                proposed_measure = np.random.choice(meas_choices)
-                proposed_label = int(np.random.choice(meas_label_choices))
-                if vcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
-                    vcomp_measure[i][j] = MEAS_TYPE_NONE
-                    vcomp_measure_label[i][j] = -1
-                else:
-                    vcomp_measure[i][j] = proposed_measure
-                    vcomp_measure_label[i][j] = proposed_label
-                    meas_label_stat[proposed_measure].append(proposed_label)
-                vcomp_direction[i][j] = int(random.random() < meas_dir_prob)
-
-                print(f"\n\nvcomp_type[{i}][{j}]: {vcomp_type[i][j]}, vcomp_value[{i}][{j}]: {vcomp_value[i][j]}, vcomp_value_unit[{i}][{j}]: {vcomp_value_unit[i][j]}")
-                print(f"vcomp_measure[{i}][{j}]: {vcomp_measure[i][j]}, vcomp_measure_label[{i}][{j}]: {vcomp_measure_label[i][j]}, vcomp_direction[{i}][{j}]: {vcomp_direction[i][j]}")
-        for i in range(m):
-            for j in range(n-1):
-                if i == 0 or i == m-1:
-                    hcomp_type[i][j] = np.random.choice(num_comp_choices_outer)
-                else:
-                    hcomp_type[i][j] = np.random.choice(num_comp_choices)
-
-                if hcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS]:
-                    VC_sources["h"].append((i, j))
-                if hcomp_type[i][j] in [TYPE_CCCS, TYPE_CCVS]:
-                    IC_sources["h"].append((i, j))
-                if hcomp_type[i][j] == TYPE_OPEN:
-                    has_hedge[i][j] = 0
-                    continue
-                
-                hcomp_value[i][j] = np.random.randint(comp_mean_value[hcomp_type[i][j]], comp_max_value[hcomp_type[i][j]])
-                hcomp_value_unit[i][j] = np.random.choice(unit_choices)
-
-                comp_cnt[hcomp_type[i][j]] += 1
-                hcomp_label[i][j] = comp_cnt[hcomp_type[i][j]]
-
-                                                                        
-                proposed_measure_h = np.random.choice(meas_choices)
-                proposed_label_h = int(np.random.choice(meas_label_choices))
-                if hcomp_type[i][j] in [TYPE_VCCS, TYPE_VCVS, TYPE_CCCS, TYPE_CCVS]:
-                    hcomp_measure[i][j] = MEAS_TYPE_NONE
-                    hcomp_measure_label[i][j] = -1
-                else:
-                    hcomp_measure[i][j] = proposed_measure_h
-                    hcomp_measure_label[i][j] = proposed_label_h
-                    meas_label_stat[proposed_measure_h].append(proposed_label_h)
-                hcomp_direction[i][j] = int(random.random() < meas_dir_prob)
-
-                print(f"\n\nhcomp_type[{i}][{j}]: {hcomp_type[i][j]}, hcomp_value[{i}][{j}]: {hcomp_value[i][j]}, hcomp_value_unit[{i}][{j}]: {hcomp_value_unit[i][j]}")
-                print(f"hcomp_measure[{i}][{j}]: {hcomp_measure[i][j]}, hcomp_measure_label[{i}][{j}]: {hcomp_measure_label[i][j]}, hcomp_direction[{i}][{j}]: {hcomp_direction[i][j]}")
-        
-                                    
-        num_vc_sources = len(VC_sources["v"]) + len(VC_sources["h"])
-        num_ic_sources = len(IC_sources["v"]) + len(IC_sources["h"])
-        num_vmeas = len(meas_label_stat[MEAS_TYPE_VOLTAGE])
-        num_imeas = len(meas_label_stat[MEAS_TYPE_CURRENT])
+        # phase 1: component types alone decide the dependent-source count, so reject
+        # before drawing measurements, values and units for the grid
+        v_types = _draw_edge_types(rng, v_outer, num_comp_lut, num_comp_lut_outer)
+        h_types = _draw_edge_types(rng, h_outer, num_comp_lut, num_comp_lut_outer)
+        v_vc, v_ic = _count_dep_sources(v_types)
+        h_vc, h_ic = _count_dep_sources(h_types)
+        num_vc_sources = v_vc + h_vc
+        num_ic_sources = v_ic + h_ic
 
                                                             
         total_dep_sources = num_vc_sources + num_ic_sources
         if total_dep_sources < 1 or total_dep_sources > 2:
             continue
 
+        # phase 2: fill the surviving grid; reset the scratch grids in place first
+        for arr in edge_flags:
+            arr.fill(1)
+        for arr in scratch:
+            arr.fill(0)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"has_vedge: {has_vedge}\n\nhas_hedge: {has_hedge}")
+
+        v_draws = _draw_edge_samples(rng, v_outer.shape, meas_lut, meas_label_lut, meas_dir_prob)
+        h_draws = _draw_edge_samples(rng, h_outer.shape, meas_lut, meas_label_lut, meas_dir_prob)
+        _fill_edges(vcomp_type, vcomp_value, vcomp_value_unit, vcomp_label, vcomp_measure, vcomp_measure_label,
+                    vcomp_direction, has_vedge, v_types, *v_draws,
+                    comp_mean_value, comp_max_value, unit_choices, rng, comp_cnt)
+        _fill_edges(hcomp_type, hcomp_value, hcomp_value_unit, hcomp_label, hcomp_measure, hcomp_measure_label,
+                    hcomp_direction, has_hedge, h_types, *h_draws,
+                    comp_mean_value, comp_max_value, unit_choices, rng, comp_cnt)
+
+        # controlled-source positions and measurement-label pools, read back off the filled grids
+        VC_sources = {
+            "v": np.argwhere((vcomp_type == TYPE_VCCS) | (vcomp_type == TYPE_VCVS)),
+            "h": np.argwhere((hcomp_type == TYPE_VCCS) | (hcomp_type == TYPE_VCVS)),
+        }
+        IC_sources = {
+            "v": np.argwhere((vcomp_type == TYPE_CCCS) | (vcomp_type == TYPE_CCVS)),
+            "h": np.argwhere((hcomp_type == TYPE_CCCS) | (hcomp_type == TYPE_CCVS)),
+        }
+        meas_label_stat = {
+            meas_type: np.concatenate((vcomp_measure_label[vcomp_measure == meas_type],
+                                       hcomp_measure_label[hcomp_measure == meas_type]))
+            for meas_type in (MEAS_TYPE_VOLTAGE, MEAS_TYPE_CURRENT)
+        }
+        num_vmeas = meas_label_stat[MEAS_TYPE_VOLTAGE].size
+        num_imeas = meas_label_stat[MEAS_TYPE_CURRENT].size
+
         if (num_vc_sources > 0 and num_vmeas == 0) or (num_ic_sources > 0 and num_imeas == 0):
             continue
 
-        print("VC_sources: ", VC_sources)
-        print("IC_sources: ", IC_sources)
-        print("meas_label_stat: ", meas_label_stat)
-
-        for i, j in VC_sources["v"]:
-            contrl_idx = random.choice(meas_label_stat[MEAS_TYPE_VOLTAGE])
-            vcomp_control_meas_label[i][j] = contrl_idx
-        for i, j in VC_sources["h"]:
-            contrl_idx = random.choice(meas_label_stat[MEAS_TYPE_VOLTAGE])
-            hcomp_control_meas_label[i][j] = contrl_idx
-        for i, j in IC_sources["v"]:
-            contrl_idx = random.choice(meas_label_stat[MEAS_TYPE_CURRENT])
-            vcomp_control_meas_label[i][j] = contrl_idx
-        for i, j in IC_sources["h"]:
-            contrl_idx = random.choice(meas_label_stat[MEAS_TYPE_CURRENT])
-            hcomp_control_meas_label[i][j] = contrl_idx
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("VC_sources: %s\nIC_sources: %s\nmeas_label_stat: %s", VC_sources, IC_sources, meas_label_stat)
+
+        for sources, meas_type in ((VC_sources, MEAS_TYPE_VOLTAGE), (IC_sources, MEAS_TYPE_CURRENT)):
+            labels = meas_label_stat[meas_type]
+            for side, comp_control_meas_label in (("v", vcomp_control_meas_label), ("h", hcomp_control_meas_label)):
+                pos = sources[side]
+                if pos.shape[0]:
+                    picks = rng.integers(0, labels.size, size=pos.shape[0])
+                    comp_control_meas_label[pos[:, 0], pos[:, 1]] = labels[picks]
                                                                         
                                                                         
                                                                             
         if rlc:
                                                                 
-            has_reactive = False
-            for ii in range(m-1):
-                for jj in range(n):
-                    if vcomp_type[ii][jj] in [TYPE_CAPACITOR, TYPE_INDUCTOR]:
-                        has_reactive = True
-                        break
-                if has_reactive:
-                    break
+            has_reactive = bool(np.isin(vcomp_type, (TYPE_CAPACITOR, TYPE_INDUCTOR)).any())
             if not has_reactive:
                                                                     
-                candidate_edges = [('v', ii, jj) for ii in range(m-1) for jj in range(n) if has_vedge[ii][jj] and vcomp_type[ii][jj] == TYPE_RESISTOR] + \
-                                    [('h', ii, jj) for ii in range(m) for jj in range(n-1) if has_hedge[ii][jj] and hcomp_type[ii][jj] == TYPE_RESISTOR]
-                if candidate_edges:
-                    chosen_edge = random.choice(candidate_edges)
-                    make_type = random.choice([TYPE_CAPACITOR, TYPE_INDUCTOR])
+                chosen_edge = _pick_edge(rng, *_resistor_edges(has_vedge, vcomp_type, has_hedge, hcomp_type))
+                if chosen_edge is not None:
+                    make_type = rng.choice([TYPE_CAPACITOR, TYPE_INDUCTOR])
                     if chosen_edge[0] == 'v':
                         ii, jj = chosen_edge[1], chosen_edge[2]
-                        vcomp_type[ii][jj] = make_type
-                        vcomp_value[ii][jj] = np.random.randint(comp_mean_value[make_type], comp_max_value[make_type])
+                        vcomp_type[ii, jj] = make_type
+                        vcomp_value[ii, jj] = rng.integers(comp_mean_value[make_type], comp_max_value[make_type])
                         print(f"Promoted resistor at vedge ({ii},{jj}) to {'C' if make_type==TYPE_CAPACITOR else 'L'} for RLC mode")
                     else:
                         ii, jj = chosen_edge[1], chosen_edge[2]
-                        hcomp_type[ii][jj] = make_type
-                        hcomp_value[ii][jj] = np.random.randint(comp_mean_value[make_type], comp_max_value[make_type])
+                        hcomp_type[ii, jj] = make_type
+                        hcomp_value[ii, jj] = rng.integers(comp_mean_value[make_type], comp_max_value[make_type])
                         print(f"Promoted resistor at hedge ({ii},{jj}) to {'C' if make_type==TYPE_CAPACITOR else 'L'} for RLC mode")
 
         break
     
                                     
-    use_value_annotation = bool(random.random() < use_value_annotation_prob)
+    use_value_annotation = bool(rng.random() < use_value_annotation_prob)
                                                                                 
     label_str_subscript = False
     label_numerical_subscript = not label_str_subscript
 
                                 
-    vcomp_type = vcomp_type.astype(int)
-    hcomp_type = hcomp_type.astype(int)
-    vcomp_label = vcomp_label.astype(int)
-    hcomp_label = hcomp_label.astype(int)
-    vcomp_value = vcomp_value.astype(int)
-    hcomp_value = hcomp_value.astype(int)
-    vcomp_value_unit = vcomp_value_unit.astype(int)
-    hcomp_value_unit = hcomp_value_unit.astype(int)
-    vcomp_measure = vcomp_measure.astype(int)
-    hcomp_measure = hcomp_measure.astype(int)
-    vcomp_measure_label = vcomp_measure_label.astype(int)
-    hcomp_measure_label = hcomp_measure_label.astype(int)
-    vcomp_measure_direction = vcomp_measure_direction.astype(int)
-    hcomp_measure_direction = hcomp_measure_direction.astype(int)
-    vcomp_control_meas_label = vcomp_control_meas_label.astype(int)
-    hcomp_control_meas_label = hcomp_control_meas_label.astype(int)
-
-    print("#"*100)
-    print("Generate a random grid for circuit ... ")
-    print(f"has_vedge: {has_vedge}\n\nhas_hedge: {has_hedge}")
-    print(f"vertical_dis: {vertical_dis}\n\nhorizontal_dis: {horizontal_dis}")
-    print(f"m:{m}, n:{n}\n\ncomp_cnt: {json.dumps(comp_cnt, indent=4)}")
-    print(f"use_value_annotation: {use_value_annotation}\nlabel_numerical_subscript: {label_numerical_subscript}")
-
-    print(f"vcomp_type: {vcomp_type}\n\nhcomp_type: {hcomp_type}")
-    print(f"vcomp_label: {vcomp_label}\n\nhcomp_label: {hcomp_label}")
-    print(f"vcomp_value: {vcomp_value}\n\nhcomp_value: {hcomp_value}")
-    print(f"vcomp_value_unit: {vcomp_value_unit}\n\nhcomp_value_unit: {hcomp_value_unit}")
-    print(f"vcomp_measure: {vcomp_measure}\n\nhcomp_measure: {hcomp_measure}")
-    print(f"vcomp_measure_label: {vcomp_measure_label}\n\nhcomp_measure_label: {hcomp_measure_label}")
-    print(f"vcomp_measure_direction: {vcomp_measure_direction}\n\nhcomp_measure_direction: {hcomp_measure_direction}")
-    print(f"vcomp_control_meas_label: {vcomp_control_meas_label}\n\nhcomp_control_meas_label: {hcomp_control_meas_label}")
+
+    if logger.isEnabledFor(logging.DEBUG):
+        grids = {
+            "has_vedge": has_vedge, "has_hedge": has_hedge,
+            "vcomp_type": vcomp_type, "hcomp_type": hcomp_type,
+            "vcomp_label": vcomp_label, "hcomp_label": hcomp_label,
+            "vcomp_value": vcomp_value, "hcomp_value": hcomp_value,
+            "vcomp_value_unit": vcomp_value_unit, "hcomp_value_unit": hcomp_value_unit,
+            "vcomp_measure": vcomp_measure, "hcomp_measure": hcomp_measure,
+            "vcomp_measure_label": vcomp_measure_label, "hcomp_measure_label": hcomp_measure_label,
+            "vcomp_measure_direction": vcomp_measure_direction, "hcomp_measure_direction": hcomp_measure_direction,
+            "vcomp_control_meas_label": vcomp_control_meas_label, "hcomp_control_meas_label": hcomp_control_meas_label,
+        }
+        logger.debug(
+            "grid m=%d n=%d comp_cnt=%s use_value_annotation=%s label_numerical_subscript=%s\nvertical_dis: %s\nhorizontal_dis: %s\n%s",
+            m, n, comp_cnt.tolist(), use_value_annotation, label_numerical_subscript, vertical_dis, horizontal_dis,
+            "\n".join(f"{name}:\n{arr}" for name, arr in grids.items()),
+        )
 
                                                                         
                                                                         
@@ -2439,127 +2489,82 @@ def gen_circuit(note="v1", id="", symbolic=False, simple_circuits=False, integra
                                                                         
 
                                         
-    for ii in range(m-1):
-        for jj in range(n):
-            if vcomp_type[ii][jj] == TYPE_CURRENT_SOURCE:
-                vcomp_type[ii][jj] = TYPE_RESISTOR
-                vcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                print(f"Converted current source at vedge ({ii},{jj}) to resistor")
-    for ii in range(m):
-        for jj in range(n-1):
-            if hcomp_type[ii][jj] == TYPE_CURRENT_SOURCE:
-                hcomp_type[ii][jj] = TYPE_RESISTOR
-                hcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                print(f"Converted current source at hedge ({ii},{jj}) to resistor")
+    for comp_type, comp_value, side in ((vcomp_type, vcomp_value, "vedge"), (hcomp_type, hcomp_value, "hedge")):
+        mask = comp_type == TYPE_CURRENT_SOURCE
+        n_hits = int(mask.sum())
+        if n_hits:
+            comp_type[mask] = TYPE_RESISTOR
+            comp_value[mask] = rng.integers(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR], size=n_hits)
+            print(f"Converted {n_hits} current source(s) on {side}s to resistors")
 
                                                 
-    voltage_positions = []                                  
-    for ii in range(m-1):
-        for jj in range(n):
-            if vcomp_type[ii][jj] == TYPE_VOLTAGE_SOURCE:
-                voltage_positions.append(('v', ii, jj))
-    for ii in range(m):
-        for jj in range(n-1):
-            if hcomp_type[ii][jj] == TYPE_VOLTAGE_SOURCE:
-                voltage_positions.append(('h', ii, jj))
-
-    if len(voltage_positions) == 0:
+    v_pos = np.argwhere(vcomp_type == TYPE_VOLTAGE_SOURCE)
+    h_pos = np.argwhere(hcomp_type == TYPE_VOLTAGE_SOURCE)
+    num_voltage_sources = v_pos.shape[0] + h_pos.shape[0]
+
+    if num_voltage_sources == 0:
                                                             
-        candidate_edges = [('v', ii, jj) for ii in range(m-1) for jj in range(n) if has_vedge[ii][jj] and vcomp_type[ii][jj] != TYPE_OPEN] + \
-                            [('h', ii, jj) for ii in range(m) for jj in range(n-1) if has_hedge[ii][jj] and hcomp_type[ii][jj] != TYPE_OPEN]
-        if candidate_edges:
-            chosen_edge = random.choice(candidate_edges)
+        # edge flags are 0/1 uint8, so a bool view avoids a copy
+        v_idx = np.argwhere(has_vedge.view(bool) & (vcomp_type != TYPE_OPEN))
+        h_idx = np.argwhere(has_hedge.view(bool) & (hcomp_type != TYPE_OPEN))
+        chosen_edge = _pick_edge(rng, v_idx, h_idx)
+        if chosen_edge is not None:
+            _, ii, jj = chosen_edge
             if chosen_edge[0] == 'v':
-                ii, jj = chosen_edge[1], chosen_edge[2]
-                vcomp_type[ii][jj] = TYPE_VOLTAGE_SOURCE
-                vcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_VOLTAGE_SOURCE], comp_max_value[TYPE_VOLTAGE_SOURCE])
+                vcomp_type[ii, jj] = TYPE_VOLTAGE_SOURCE
+                vcomp_value[ii, jj] = rng.integers(comp_mean_value[TYPE_VOLTAGE_SOURCE], comp_max_value[TYPE_VOLTAGE_SOURCE])
                 print(f"Promoted edge at vedge ({ii},{jj}) to voltage source")
             else:
-                ii, jj = chosen_edge[1], chosen_edge[2]
-                hcomp_type[ii][jj] = TYPE_VOLTAGE_SOURCE
-                hcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_VOLTAGE_SOURCE], comp_max_value[TYPE_VOLTAGE_SOURCE])
+                hcomp_type[ii, jj] = TYPE_VOLTAGE_SOURCE
+                hcomp_value[ii, jj] = rng.integers(comp_mean_value[TYPE_VOLTAGE_SOURCE], comp_max_value[TYPE_VOLTAGE_SOURCE])
                 print(f"Promoted edge at hedge ({ii},{jj}) to voltage source")
-    elif len(voltage_positions) > 1:
-                                                                        
-        keep = voltage_positions[0]
-        for pos in voltage_positions[1:]:
-            if pos[0] == 'v':
-                vcomp_type[pos[1]][pos[2]] = TYPE_RESISTOR
-                vcomp_value[pos[1]][pos[2]] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                print(f"Demoted extra voltage source at vedge ({pos[1]},{pos[2]}) to resistor")
-            else:
-                hcomp_type[pos[1]][pos[2]] = TYPE_RESISTOR
-                hcomp_value[pos[1]][pos[2]] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                print(f"Demoted extra voltage source at hedge ({pos[1]},{pos[2]}) to resistor")
+    elif num_voltage_sources > 1:
+        _demote_extras_to_resistor(vcomp_type, hcomp_type, vcomp_value, hcomp_value, v_pos, h_pos,
+                                   comp_mean_value, comp_max_value, rng, "voltage source")
 
-    print(f"Voltage source constraint enforced: {len(voltage_positions)} initial voltage sources found")
+    print(f"Voltage source constraint enforced: {num_voltage_sources} initial voltage sources found")
 
                                                                                 
-    reassign_unique_labels(vcomp_type, hcomp_type, vcomp_label, hcomp_label, m, n)
-    print("Component labels reassigned to ensure uniqueness")
 
                                                                         
                                                                 
                                                                         
     if integrator:
                                                 
-        integrator_positions = []                                  
-        for ii in range(m-1):
-            for jj in range(n):
-                if vcomp_type[ii][jj] == TYPE_OPAMP_INTEGRATOR:
-                    integrator_positions.append(('v', ii, jj))
-        for ii in range(m):
-            for jj in range(n-1):
-                if hcomp_type[ii][jj] == TYPE_OPAMP_INTEGRATOR:
-                    integrator_positions.append(('h', ii, jj))
-
-        if len(integrator_positions) == 0:
+        v_pos = np.argwhere(vcomp_type == TYPE_OPAMP_INTEGRATOR)
+        h_pos = np.argwhere(hcomp_type == TYPE_OPAMP_INTEGRATOR)
+        num_integrators = v_pos.shape[0] + h_pos.shape[0]
+
+        if num_integrators == 0:
                                                                     
-            candidate_edges = [('v', ii, jj) for ii in range(m-1) for jj in range(n) if has_vedge[ii][jj] and vcomp_type[ii][jj] == TYPE_RESISTOR] + \
-                                [('h', ii, jj) for ii in range(m) for jj in range(n-1) if has_hedge[ii][jj] and hcomp_type[ii][jj] == TYPE_RESISTOR]
-            if candidate_edges:
-                chosen_edge = random.choice(candidate_edges)
+            chosen_edge = _pick_edge(rng, *_resistor_edges(has_vedge, vcomp_type, has_hedge, hcomp_type))
+            if chosen_edge is not None:
                 if chosen_edge[0] == 'v':
                     ii, jj = chosen_edge[1], chosen_edge[2]
-                    vcomp_type[ii][jj] = TYPE_OPAMP_INTEGRATOR
-                    vcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
+                    vcomp_type[ii, jj] = TYPE_OPAMP_INTEGRATOR
+                    vcomp_value[ii, jj] = rng.integers(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
                     print(f"Promoted resistor at vedge ({ii},{jj}) to integrator")
                 else:
                     ii, jj = chosen_edge[1], chosen_edge[2]
-                    hcomp_type[ii][jj] = TYPE_OPAMP_INTEGRATOR
-                    hcomp_value[ii][jj] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
+                    hcomp_type[ii, jj] = TYPE_OPAMP_INTEGRATOR
+                    hcomp_value[ii, jj] = rng.integers(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
                     print(f"Promoted resistor at hedge ({ii},{jj}) to integrator")
-        elif len(integrator_positions) > 1:
-                                                                        
-            keep = integrator_positions[0]
-            for pos in integrator_positions[1:]:
-                if pos[0] == 'v':
-                    vcomp_type[pos[1]][pos[2]] = TYPE_RESISTOR
-                    vcomp_value[pos[1]][pos[2]] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                    print(f"Demoted extra integrator at vedge ({pos[1]},{pos[2]}) to resistor")
-                else:
-                    hcomp_type[pos[1]][pos[2]] = TYPE_RESISTOR
-                    hcomp_value[pos[1]][pos[2]] = np.random.randint(comp_mean_value[TYPE_RESISTOR], comp_max_value[TYPE_RESISTOR])
-                    print(f"Demoted extra integrator at hedge ({pos[1]},{pos[2]}) to resistor")
+        elif num_integrators > 1:
+            _demote_extras_to_resistor(vcomp_type, hcomp_type, vcomp_value, hcomp_value, v_pos, h_pos,
+                                       comp_mean_value, comp_max_value, rng, "integrator")
 
-        print(f"Integrator constraint enforced: {len(integrator_positions)} initial integrators found")
+        print(f"Integrator constraint enforced: {num_integrators} initial integrators found")
 
-                                                                    
-        reassign_unique_labels(vcomp_type, hcomp_type, vcomp_label, hcomp_label, m, n)
-        print("Component labels reassigned after integrator enforcement")
+    # relabel once, after every type rewrite above
+    reassign_unique_labels(vcomp_type, hcomp_type, vcomp_label, hcomp_label, m, n)
+    print("Component labels reassigned to ensure uniqueness")
 
                                                                                                                                                     
                                                                                                                         
     if rlc:
                                                         
-        for ii in range(m-1):
-            for jj in range(n):
-                if vcomp_type[ii][jj] == TYPE_VOLTAGE_SOURCE:
-                    vcomp_measure[ii][jj] = MEAS_TYPE_NONE
-        for ii in range(m):
-            for jj in range(n-1):
-                if hcomp_type[ii][jj] == TYPE_VOLTAGE_SOURCE:
-                    hcomp_measure[ii][jj] = MEAS_TYPE_NONE
+        vcomp_measure[vcomp_type == TYPE_VOLTAGE_SOURCE] = MEAS_TYPE_NONE
+        hcomp_measure[hcomp_type == TYPE_VOLTAGE_SOURCE] = MEAS_TYPE_NONE
 
     circ = Circuit(m, n, vertical_dis, horizontal_dis, has_vedge, has_hedge, vcomp_type, hcomp_type, vcomp_label, hcomp_label, \
                     vcomp_value=vcomp_value, hcomp_value=hcomp_value, \
@@ -6,11 +6,12 @@ compiles LaTeX to PDF, converts PDF to JPG, and generates labels.json.
 """
 
 import argparse
-import json
 import logging
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Optional
 
 # Add repo root to path for imports
 script_path = Path(__file__).resolve()
@@ -20,39 +21,86 @@ if str(repo_root) not in sys.path:
 
 from utils.dataprocess_utils import preprocess_latex, compile_latex, pdf2jpg
 
+from utils.fastjson import dumps as _dumps, loads as _loads  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
 
+def _compile_one(args: tuple[str, str, str]) -> tuple[str, bool, Optional[str]]:
+    """Compile a single LaTeX document in a worker process.
+    
+    Args:
+        args: Tuple of (circuit_id, latex_code, output_dir)
+    
+    Returns:
+        Tuple of (circuit_id, success, error message or None)
+    """
+    circuit_id, latex_code, output_dir = args
+    try:
+        processed_latex = preprocess_latex(latex_code)
+        return circuit_id, compile_latex(output_dir, circuit_id, processed_latex), None
+    except Exception as e:
+        return circuit_id, False, str(e)
+
+
+def _convert_one(args: tuple[str, str, str]) -> tuple[str, bool]:
+    """Convert a single PDF to JPG in a worker process.
+    
+    PyMuPDF does not support multithreaded use, so each conversion runs in
+    its own process rather than a thread.
+    
+    Args:
+        args: Tuple of (circuit_id, pdf_path, jpg_path)
+    
+    Returns:
+        Tuple of (circuit_id, success)
+    """
+    circuit_id, pdf_path, jpg_path = args
+    return circuit_id, pdf2jpg(pdf_path, jpg_path, zoom_x=2, zoom_y=2)
+
+
 def compile_latex_codes(
     latex_codes: Dict[str, str],
     output_dir: Path,
-    label_key: str = "spice"
+    label_key: str = "spice",
+    max_workers: Optional[int] = None
 ) -> Dict[str, bool]:
     """Compile LaTeX codes to PDFs.
     
+    Each document is an independent pdflatex run, so they are compiled
+    concurrently in a process pool.
+    
     Args:
         latex_codes: Dictionary mapping circuit IDs to LaTeX code
         output_dir: Directory to save PDFs
         label_key: Key to use in labels (default: "spice")
+        max_workers: Number of worker processes (default: os.cpu_count())
     
     Returns:
         Dictionary mapping circuit IDs to success status
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     results = {}
+    if not latex_codes:
+        return results
     
-    for circuit_id, latex_code in latex_codes.items():
-        try:
-            processed_latex = preprocess_latex(latex_code)
-            success = compile_latex(str(output_dir), circuit_id, processed_latex)
+    tasks = [(circuit_id, latex_code, str(output_dir)) for circuit_id, latex_code in latex_codes.items()]
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {executor.submit(_compile_one, task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            circuit_id = futures[future]
+            try:
+                circuit_id, success, error = future.result()
+            except Exception as e:
+                success, error = False, str(e)
             results[circuit_id] = success
-            if not success:
+            if error is not None:
+                logger.error(f"Error compiling LaTeX for circuit {circuit_id}: {error}")
+            elif not success:
                 logger.warning(f"Failed to compile LaTeX for circuit {circuit_id}")
-        except Exception as e:
-            logger.error(f"Error compiling LaTeX for circuit {circuit_id}: {e}")
-            results[circuit_id] = False
     
-    return results
+    # Keep the input order for downstream consumers
+    return {circuit_id: results[circuit_id] for circuit_id in latex_codes}
 
 
 def check_compiled_latex_codes(
@@ -71,9 +119,14 @@ def check_compiled_latex_codes(
     compiled_files = []
     not_compiled_files = []
     
+    # One directory listing instead of a stat() per circuit
+    try:
+        existing_pdfs = {name[:-4] for name in os.listdir(output_dir) if name.endswith(".pdf")}
+    except FileNotFoundError:
+        existing_pdfs = set()
+    
     for circuit_id, success in compiled_results.items():
-        pdf_path = output_dir / f"{circuit_id}.pdf"
-        if success and pdf_path.exists():
+        if success and circuit_id in existing_pdfs:
             compiled_files.append(circuit_id)
         else:
             not_compiled_files.append(circuit_id)
@@ -95,36 +148,37 @@ def make_datasets(
     """
     dataset_path.mkdir(parents=True, exist_ok=True)
     
-    # Read JSONL data
+    # Read JSONL data, extracting LaTeX codes as each line is parsed
     logger.info(f"Reading circuit data from {data_file}")
-    circuits_data = []
-    with open(data_file, "r", encoding="utf-8") as f:
+    num_loaded = 0
+    latex_codes = {}
+    circuit_metadata = {}
+    with open(data_file, "rb") as f:
         for line in f:
             line = line.strip()
-            if line:
-                try:
-                    circuits_data.append(json.loads(line))
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Skipping invalid JSON line: {e}")
-    
-    logger.info(f"Loaded {len(circuits_data)} circuits")
+            if not line:
+                continue
+            try:
+                item = _loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid JSON line: {e}")
+                continue
+            num_loaded += 1
+            
+            circuit_id = item.get("id")
+            if not circuit_id:
+                logger.warning("Skipping circuit without ID")
+                continue
+            
+            latex_code = item.get("latex")
+            if not latex_code:
+                logger.warning(f"Skipping circuit {circuit_id} without LaTeX code")
+                continue
+            
+            latex_codes[circuit_id] = latex_code
+            circuit_metadata[circuit_id] = item
     
-    # Extract LaTeX codes
-    latex_codes = {}
-    circuit_metadata = {}
-    for item in circuits_data:
-        circuit_id = item.get("id")
-        if not circuit_id:
-            logger.warning("Skipping circuit without ID")
-            continue
-        
-        latex_code = item.get("latex")
-        if not latex_code:
-            logger.warning(f"Skipping circuit {circuit_id} without LaTeX code")
-            continue
-        
-        latex_codes[circuit_id] = latex_code
-        circuit_metadata[circuit_id] = item
+    logger.info(f"Loaded {num_loaded} circuits")
     
     # Compile LaTeX to PDF
     pdf_dir = dataset_path / "pdfs"
@@ -143,38 +197,45 @@ def make_datasets(
     converted_count = 0
     failed_count = 0
     
-    for circuit_id in compiled_files:
-        pdf_path = pdf_dir / f"{circuit_id}.pdf"
-        jpg_path = jpg_dir / f"{circuit_id}.jpg"
-        
-        try:
-            success = pdf2jpg(str(pdf_path), str(jpg_path), zoom_x=2, zoom_y=2)
-            if success:
-                converted_count += 1
-            else:
+    pdf_prefix = str(pdf_dir) + os.sep
+    jpg_prefix = str(jpg_dir) + os.sep
+    
+    tasks = [
+        (circuit_id, f"{pdf_prefix}{circuit_id}.pdf", f"{jpg_prefix}{circuit_id}.jpg")
+        for circuit_id in compiled_files
+    ]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {executor.submit(_convert_one, task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            circuit_id = futures[future]
+            try:
+                circuit_id, success = future.result()
+                if success:
+                    converted_count += 1
+                else:
+                    failed_count += 1
+                    logger.warning(f"Failed to convert PDF to JPG for circuit {circuit_id}")
+            except Exception as e:
                 failed_count += 1
-                logger.warning(f"Failed to convert PDF to JPG for circuit {circuit_id}")
-        except Exception as e:
-            failed_count += 1
-            logger.error(f"Error converting PDF to JPG for circuit {circuit_id}: {e}")
+                logger.error(f"Error converting PDF to JPG for circuit {circuit_id}: {e}")
     
     logger.info(f"Converted {converted_count} JPGs, {failed_count} failed")
     
     # Generate labels.json
-    labels = {}
-    for circuit_id in compiled_files:
-        if circuit_id in circuit_metadata:
-            metadata = circuit_metadata[circuit_id]
-            labels[circuit_id] = {
-                "image": f"images/{circuit_id}.jpg",
-                label_key: metadata.get(label_key, ""),
-                "latex": metadata.get("latex", ""),
-                "stat": metadata.get("stat", {})
-            }
+    compiled_set = set(compiled_files)
+    labels = {
+        circuit_id: {
+            "image": f"images/{circuit_id}.jpg",
+            label_key: metadata.get(label_key, ""),
+            "latex": metadata.get("latex", ""),
+            "stat": metadata.get("stat", {})
+        }
+        for circuit_id, metadata in circuit_metadata.items()
+        if circuit_id in compiled_set
+    }
     
     labels_file = dataset_path / "labels.json"
-    with open(labels_file, "w", encoding="utf-8") as f:
-        json.dump(labels, f, ensure_ascii=False, indent=2)
+    labels_file.write_bytes(_dumps(labels, indent=True))
     
     logger.info(f"Generated labels.json with {len(labels)} entries")
     logger.info(f"Dataset saved to {dataset_path}")
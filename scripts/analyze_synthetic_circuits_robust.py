@@ -1,57 +1,188 @@
-import json
+import io
 import argparse
+import gzip
 import logging
+import os
 from pathlib import Path
 from lcapy import Circuit, s, t
 from lcapy import mna
 import re
 import multiprocessing
+import signal
+import threading
 import time
-from functools import partial
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache, partial
+import numpy as np
 import sympy as sp
+from sympy.core.function import AppliedUndef
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from utils.fastjson import dumps as _json_dumps, loads as _json_loads
+from utils.sentinels import SENTINELS
 from convert_netlist_remove_n_nodes import convert_netlist_remove_n_nodes
 
 logger = logging.getLogger(__name__)
 
-def _multiprocessing_target(queue, func_data):
+def _multiprocessing_target(conn, func_data):
                                                                             
     try:
         func, args = func_data
         result = func(*args)
-        queue.put(('success', result))
+        conn.send(('success', result))
     except Exception as e:
-        queue.put(('error', str(e)))
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
 
 def run_with_timeout(func, args, timeout_seconds):
-                                                                              
-    queue = multiprocessing.Queue()
+    # one result, one reader: a plain pipe avoids the Queue feeder thread and lock
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
     func_data = (func, args)
-    process = multiprocessing.Process(target=_multiprocessing_target, args=(queue, func_data))
+    process = multiprocessing.Process(target=_multiprocessing_target, args=(child_conn, func_data))
     process.start()
-    process.join(timeout=timeout_seconds)
+    child_conn.close()
     
-    if process.is_alive():
-                                      
-        process.terminate()
+    try:
+        # wait on the pipe rather than join() so a large result can't block the child
+        if not parent_conn.poll(timeout_seconds):
+            process.terminate()
+            process.join()
+            return None, f"Timeout after {timeout_seconds}s"
+        result_type, result = parent_conn.recv()
+    except EOFError:
         process.join()
-        return None, f"Timeout after {timeout_seconds}s"
-    
-    if queue.empty():
         return None, "Process ended without result"
+    finally:
+        parent_conn.close()
     
-    result_type, result = queue.get()
+    process.join()
     if result_type == 'success':
         return result, None
     else:
         return None, result
 
+# Persistent worker reused across computations; only replaced after a timeout
+_POOL = None
+
+def _worker_init():
+    """Warm a pool worker so the first submitted computation doesn't pay for imports."""
+    import lcapy  # noqa: F401
+    import lcapy.mna  # noqa: F401
+    import sympy.matrices  # noqa: F401
+    # intern the symbols every limit/MNA pass recreates
+    sp.symbols('Ad', positive=True)
+    sp.symbols('s')
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        methods = multiprocessing.get_all_start_methods()
+        # fork shares the already-imported lcapy/sympy modules with the worker
+        ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        _POOL = ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_worker_init)
+    return _POOL
+
+def _shutdown_pool(kill=False):
+    """Shut down the persistent worker pool, killing busy workers if requested."""
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is None:
+        return
+    if kill:
+        # a worker stuck in SymPy cannot be cancelled cooperatively
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            if process.is_alive():
+                process.kill()
+    pool.shutdown(wait=not kill, cancel_futures=True)
+
+def run_in_pool(func, args, timeout_seconds):
+    """Run func(*args) on the persistent worker, returning (result, error)."""
+    try:
+        future = _get_pool().submit(func, *args)
+    except (BrokenProcessPool, RuntimeError):
+        _shutdown_pool(kill=True)
+        return run_with_timeout(func, args, timeout_seconds)
+    
+    try:
+        return future.result(timeout=timeout_seconds), None
+    except FutureTimeoutError:
+        future.cancel()
+        _shutdown_pool(kill=True)
+        return None, f"Timeout after {timeout_seconds}s"
+    except BrokenProcessPool:
+        _shutdown_pool(kill=True)
+        return None, "Process ended without result"
+    except Exception as e:
+        return None, str(e)
+
+class ComputationTimeout(BaseException):
+    """Raised by time_limit; a BaseException so broad `except Exception` handlers don't swallow it."""
+
+@contextmanager
+def time_limit(seconds):
+    """Interrupt the enclosed block with ComputationTimeout after `seconds` (Unix, main thread only)."""
+    def _handler(signum, frame):
+        raise ComputationTimeout()
+    previous = signal.signal(signal.SIGALRM, _handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def run_in_process(func, args, timeout_seconds):
+    """Run func(*args) in this process under a SIGALRM timeout, returning (result, error)."""
+    try:
+        with time_limit(timeout_seconds):
+            return func(*args), None
+    except ComputationTimeout:
+        return None, f"Timeout after {timeout_seconds}s"
+    except Exception as e:
+        return None, str(e)
+
+# Set in outer analysis workers, where SIGALRM is always available (they run in their main thread)
+_IN_PROCESS_TIMEOUTS = False
+# Longer computations go to the worker process, which can be killed even inside a C extension
+_ALARM_MAX_TIMEOUT = 60
+
+def _can_use_alarm():
+    return hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+
+def _init_analysis_worker(worker_counter=None, cpus=None):
+    global _IN_PROCESS_TIMEOUTS
+    _IN_PROCESS_TIMEOUTS = hasattr(signal, 'SIGALRM')
+    # outer workers already use every core; keep numeric libraries single-threaded
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = '1'
+    # pin each worker to its own core so it doesn't migrate and lose its caches (Linux only)
+    if worker_counter is not None and cpus and hasattr(os, 'sched_setaffinity'):
+        with worker_counter.get_lock():
+            worker_id = worker_counter.value
+            worker_counter.value += 1
+        try:
+            os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+        except OSError:
+            pass
+
 def safe_computation_mp(func, args, timeout_seconds=30, description="computation"):
-    """Run computation with timeout using multiprocessing."""
+    """Run computation with timeout, in-process via SIGALRM or on a persistent worker process."""
     logger.debug(f"Starting {description} (timeout: {timeout_seconds}s)...")
     start_time = time.time()
     
-    result, error = run_with_timeout(func, args, timeout_seconds)
+    if timeout_seconds <= _ALARM_MAX_TIMEOUT and (_IN_PROCESS_TIMEOUTS or _can_use_alarm()):
+        result, error = run_in_process(func, args, timeout_seconds)
+    else:
+        result, error = run_in_pool(func, args, timeout_seconds)
     
     elapsed = time.time() - start_time
     if error:
@@ -64,38 +195,113 @@ def safe_computation_mp(func, args, timeout_seconds=30, description="computation
         logger.debug(f"{description} completed in {elapsed:.1f}s")
         return result
 
-def limit_ad_to_infinity_str(expr_str):
-    """Limit Ad symbol to infinity in expression string."""
+_AD_RE = re.compile(r'\bAd\b')
+
+def _rational_limit_at_infinity(expr, var):
+    """Limit of a rational function in `var` as var -> oo, or None when it isn't one (or diverges)."""
     try:
-        if expr_str is None or ('Ad' not in str(expr_str)):
-            return expr_str
+        numer, denom = sp.fraction(sp.cancel(expr))
+        pn, pd = sp.Poly(numer, var), sp.Poly(denom, var)
+    except (sp.PolynomialError, sp.SympifyError, TypeError, AttributeError):
+        return None
+    if pn.is_zero or pn.degree() < pd.degree():
+        return sp.S.Zero
+    if pn.degree() == pd.degree():
+        return pn.LC() / pd.LC()
+    return None
 
+@lru_cache(maxsize=1024)
+def _limit_ad_to_infinity(expr_str):
                                                                                     
-        Ad = sp.symbols('Ad', positive=True)
-        s_sym = sp.symbols('s')                    
+    Ad = sp.symbols('Ad', positive=True)
+    s_sym = sp.symbols('s')                    
 
                                                                              
-        expr = sp.sympify(str(expr_str), locals={'s': s_sym, 'Ad': Ad})
+    expr = sp.sympify(expr_str, locals={'s': s_sym, 'Ad': Ad})
+    return str(_limit_expr(expr, Ad))
+
+def _limit_expr(expr, Ad):
+    """Limit of a scalar SymPy expression as Ad -> oo."""
+    if Ad not in expr.free_symbols:
+        return expr
+    limited = _rational_limit_at_infinity(expr, Ad)
+    if limited is None:
         limited = sp.limit(expr, Ad, sp.oo)
-        simplified = sp.simplify(limited)
-        return str(simplified)
+    # simplify is the expensive step; skip it when the limit changed nothing
+    if limited == expr:
+        return expr
+    return sp.simplify(limited)
+
+def limit_ad_to_infinity_str(expr_str):
+    """Limit Ad symbol to infinity in expression string."""
+    try:
+        if expr_str is None or not _AD_RE.search(str(expr_str)):
+            return expr_str
+        return _limit_ad_to_infinity(str(expr_str))
     except Exception:
                                                       
         return expr_str
 
-def _compute_transfer_function(circuit, vs_nodes, comp):
+def limit_ad_to_infinity_equation(eq):
+    """Limit Ad to infinity in a solved MNA system y = A**-1 b (lcapy Equation or SymPy Eq).
+    
+    The side holding A**-1 b is evaluated before the limit is taken cell by
+    cell, since the limit of an inverse is not the inverse of the limited
+    matrix. Returns the input unchanged when it contains no Ad.
+    
+    Raises:
+        ValueError: If the system is not in solved form (e.g. A y = b)
+    """
+    lhs = getattr(eq.lhs, 'sympy', eq.lhs)
+    rhs = getattr(eq.rhs, 'sympy', eq.rhs)
+    lhs_ads = [sym for sym in lhs.free_symbols if sym.name == 'Ad']
+    rhs_ads = [sym for sym in rhs.free_symbols if sym.name == 'Ad']
+    if not (lhs_ads or rhs_ads):
+        return eq
+    # the unknowns are applied functions such as vn1(t); A**-1 b must not contain them
+    if (lhs_ads and rhs_ads) or (rhs if rhs_ads else lhs).atoms(AppliedUndef):
+        raise ValueError("Expected the MNA system in the form y = A**-1 b")
+    Ad = sp.symbols('Ad', positive=True)
+    
+    def _cell(cell):
+        if not cell.has(Ad):
+            return cell
+        try:
+            return _limit_expr(cell, Ad)
+        except Exception:
+            return cell
+    
+    def _limit_side(side, ads):
+        solved = side.xreplace({sym: Ad for sym in ads}).doit()
+        if isinstance(solved, sp.MatrixBase):
+            return solved.applyfunc(_cell)
+        return _cell(solved)
+    
+    if rhs_ads:
+        rhs = _limit_side(rhs, rhs_ads)
+    else:
+        lhs = _limit_side(lhs, lhs_ads)
+    if isinstance(eq, sp.Equality):
+        return sp.Eq(lhs, rhs, evaluate=False)
+    return type(eq)(lhs, rhs)
+
+@lru_cache(maxsize=128)
+def _build_circuit(netlist_str, domain='t'):
+    """Build (and memoize per worker) the lcapy circuit for a cleaned netlist."""
+    if domain == 's':
+        return _build_circuit(netlist_str, 't').laplace()
+    return Circuit(netlist_str)
+
+def _compute_transfer_function(netlist_str, vs_nodes, comp):
                                                                                    
-    tf = str(circuit.transfer(vs_nodes, comp))
+    tf = str(_build_circuit(netlist_str).transfer(vs_nodes, comp))
     return limit_ad_to_infinity_str(tf)
 
-def _compute_mna_analysis(circuit, domain='t'):
-    """Compute MNA analysis for circuit in given domain."""
+def _compute_mna_analysis(netlist_str, domain='t'):
+    """Compute MNA analysis for a cleaned netlist in given domain."""
     try:
         logger.debug(f"Creating {domain}-domain circuit for MNA...")
-        if domain == 's':
-            circuit_domain = circuit.laplace()
-        else:
-            circuit_domain = circuit
+        circuit_domain = _build_circuit(netlist_str, domain)
             
         logger.debug("Creating MNA object...")
         try:
@@ -118,19 +324,30 @@ def _compute_mna_analysis(circuit, domain='t'):
             
         logger.debug("Converting to readable form...")
         
-                                                                                  
-                                                                                      
+        try:
+            matrix_eqs = limit_ad_to_infinity_equation(matrix_eqs)
+            limited = True
+        except Exception:
+            limited = False
         try:
             basic_repr = str(matrix_eqs)
         except Exception as basic_error:
             basic_repr = f"<ERROR_GETTING_BASIC_REPR: {str(basic_error)}>"
 
-        return limit_ad_to_infinity_str(basic_repr)
+        # not in solved form: fall back to limiting the printed equations
+        return basic_repr if limited else limit_ad_to_infinity_str(basic_repr)
 
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        return f"MNA Error: {str(e)}\nDetails:\n{error_details}"
+        # keep the traceback out of the (pickled) result; it's only useful when debugging
+        logger.debug("MNA failed", exc_info=True)
+        return f"MNA Error: {type(e).__name__}: {e}"
+
+def _compute_mna_analysis_both(netlist_str):
+    """Compute the t- and s-domain MNA analyses in one call, returning (t_result, s_result)."""
+    return _compute_mna_analysis(netlist_str, 't'), _compute_mna_analysis(netlist_str, 's')
+
+# A coefficient containing any of these needs parentheses before "*unknown"
+_OP_CHARS = frozenset('+-*/^s')
 
 def _convert_matrix_to_readable(matrix_eqs, mna_obj):
                                                          
@@ -174,37 +391,49 @@ def _convert_matrix_to_readable(matrix_eqs, mna_obj):
                                                  
             return f"Matrix structure not in expected A*x = b format.\nMatrix form:\n{str(matrix_eqs)}"
         
-        equations = []
+        buf = io.StringIO()
+        
+        # only the non-zero coefficients, as {(i, j): coeff}
+        try:
+            nonzero = A_matrix.todok()
+        except AttributeError:
+            nonzero = {(i, j): A_matrix[i, j] for i in range(A_matrix.rows)
+                       for j in range(A_matrix.cols) if A_matrix[i, j] != 0}
+        row_entries = {}
+        for (i, j), coeff in sorted(nonzero.items()):
+            if j < len(unknowns):
+                row_entries.setdefault(i, []).append((j, coeff))
         
-                                                        
         for i in range(A_matrix.rows):
             lhs_terms = []
             
-                                        
-            for j in range(min(A_matrix.cols, len(unknowns))):
+            for j, coeff in row_entries.get(i, ()):
                 try:
-                    coeff = A_matrix[i, j]
-                    
-                                                        
-                    if hasattr(coeff, 'is_zero') and coeff.is_zero:
-                        continue
-                    if str(coeff) == '0' or coeff == 0:
+                    coeff_str = str(coeff)
+                    if coeff_str == '0':
                         continue
                         
                     unknown = str(unknowns[j])
-                    coeff_str = str(coeff)
                     
                                                          
                     if coeff_str == '1':
-                        lhs_terms.append(f"{unknown}")
+                        term = unknown
                     elif coeff_str == '-1':
-                        lhs_terms.append(f"-{unknown}")
+                        term = f"-{unknown}"
                     else:
                                                                   
-                        if any(op in coeff_str for op in ['+', '-', '*', '/', '^', 's']):
-                            lhs_terms.append(f"({coeff_str})*{unknown}")
+                        if not _OP_CHARS.isdisjoint(coeff_str):
+                            term = f"({coeff_str})*{unknown}"
                         else:
-                            lhs_terms.append(f"{coeff_str}*{unknown}")
+                            term = f"{coeff_str}*{unknown}"
+                    
+                    # carry the sign into the separator instead of patching "+ -" afterwards
+                    if not lhs_terms:
+                        lhs_terms.append(term)
+                    elif term.startswith('-'):
+                        lhs_terms.append(f" - {term[1:]}")
+                    else:
+                        lhs_terms.append(f" + {term}")
                             
                 except Exception as coeff_error:
                                                    
@@ -222,16 +451,14 @@ def _convert_matrix_to_readable(matrix_eqs, mna_obj):
             
                                    
             if lhs_terms:
-                lhs = " + ".join(lhs_terms).replace("+ -", "- ")
-                                               
-                lhs = lhs.replace("- -", "+ ").replace("+ +", "+ ")
-                equation = f"{lhs} = {rhs}"
-                equations.append(equation)
+                buf.write(''.join(lhs_terms))
+                buf.write(f" = {rhs}\n")
             elif rhs != '0':                                   
-                equations.append(f"0 = {rhs}")
+                buf.write(f"0 = {rhs}\n")
         
+        equations = buf.getvalue()
         if equations:
-            return "\n".join(equations)
+            return equations[:-1]
         else:
             return f"Matrix form (no readable equations generated):\n{str(matrix_eqs)}"
         
@@ -252,6 +479,30 @@ def _convert_matrix_to_readable(matrix_eqs, mna_obj):
         except:
             return f"Conversion Error: {str(e)}\nMatrix form:\n{str(matrix_eqs)}"
 
+# Node names keep only word characters; everything else becomes '_'
+_NON_WORD_RE = re.compile(r'[^\w]')
+# Dot-directives, print statements and analysis commands carry no components
+_DIRECTIVE_RE = re.compile(r'\.|print|ac |dc |tran |op')
+_VALID_COMPS = frozenset('RLCVIEFGH')
+_CONTROLLED_SOURCES = frozenset('EGFH')
+# Per component letter: node count, minimum token count and output line layout
+_NODE_COUNTS = {'E': 4, 'G': 4, 'F': 3, 'H': 3}
+_MIN_PARTS = {'E': 6, 'G': 5}
+_TWO_TERMINAL_TEMPLATE = "{c} {n[0]} {n[1]} {value}"
+_TEMPLATES = {
+    'E': "{c} {n[0]} {n[1]} {n[2]} {n[3]} {value} {ac_gain}",
+    'G': "{c} {n[0]} {n[1]} {n[2]} {n[3]} {value}",
+    'F': "{c} {n[0]} {n[1]} {n[2]} {value}",
+    'H': "{c} {n[0]} {n[1]} {n[2]} {value}",
+}
+
+def _preserve_symbol(value):
+    """Map an empty controlled-source gain to 1, keeping symbolic values as-is."""
+    if value == '<Empty>':
+        return '1'
+    return value
+
+@lru_cache(maxsize=4096)
 def clean_netlist_for_lcapy(spice_netlist):
     """Clean SPICE netlist for lcapy compatibility."""
     lines = []
@@ -275,11 +526,7 @@ def clean_netlist_for_lcapy(spice_netlist):
             continue
             
                                
-        if line.startswith('.') or line.startswith('print') or ';' in line:
-            continue
-            
-                                      
-        if line.startswith(('ac ', 'dc ', 'tran ', 'op')):
+        if _DIRECTIVE_RE.match(line) or ';' in line:
             continue
         
         parts = line.split()
@@ -287,143 +534,130 @@ def clean_netlist_for_lcapy(spice_netlist):
             continue
             
         component = parts[0]
+        ctype = component[0].upper()
         
-                                                      
-        if not component[0].upper() in ['R', 'L', 'C', 'V', 'I', 'E', 'F', 'G', 'H']:
+        if ctype not in _VALID_COMPS or len(parts) < _MIN_PARTS.get(ctype, 4):
             continue
         
-                                                                   
-        def preserve_symbol(value):
-            if value == '<Empty>':
-                return '1'
-                                        
-            if re.match(r'^x_\d+$', value):
-                return value
-            return value
-        
-                                                                      
-        if component.upper().startswith('E'):
-                                                          
-            if len(parts) >= 6:                                
-                output_p, output_n = parts[1], parts[2]
-                input_p, input_n = parts[3], parts[4]
-                gain = parts[5]
+        n_nodes = _NODE_COUNTS.get(ctype, 2)
+        nodes = [_NON_WORD_RE.sub('_', p) for p in parts[1:1 + n_nodes]]
+        ac_gain = None
+        
+        if ctype in _CONTROLLED_SOURCES:
+            # controlled sources: the gain/transresistance follows the nodes
+            value = parts[1 + n_nodes] if len(parts) > 1 + n_nodes else "1"
+            value = _preserve_symbol(value)
+            if ctype == 'E':
                 ac_gain = parts[6] if len(parts) > 6 else "0"
-                
-                                                                                           
-                output_p = re.sub(r'[^\w]', '_', output_p)
-                output_n = re.sub(r'[^\w]', '_', output_n)
-                input_p = re.sub(r'[^\w]', '_', input_p)
-                input_n = re.sub(r'[^\w]', '_', input_n)
-                
-                                         
-                gain = preserve_symbol(gain)
                 if ac_gain == '<Empty>':
                     ac_gain = "0"
-                
-                lines.append(f"{component} {output_p} {output_n} {input_p} {input_n} {gain} {ac_gain}")
-            else:
-                continue
-        elif component.upper().startswith('G'):
-                                                   
-            if len(parts) >= 5:                                
-                output_p, output_n = parts[1], parts[2]
-                input_p, input_n = parts[3], parts[4]
-                value = parts[5] if len(parts) > 5 else "1"
-                
-                                  
-                output_p = re.sub(r'[^\w]', '_', output_p)
-                output_n = re.sub(r'[^\w]', '_', output_n)
-                input_p = re.sub(r'[^\w]', '_', input_p)
-                input_n = re.sub(r'[^\w]', '_', input_n)
-                
-                value = preserve_symbol(value)
-                
-                lines.append(f"{component} {output_p} {output_n} {input_p} {input_n} {value}")
-            else:
-                continue
-        elif component.upper().startswith('F'):
-                                                    
-            if len(parts) >= 4:
-                output_p, output_n = parts[1], parts[2]
-                vcontrol = parts[3]
-                value = parts[4] if len(parts) > 4 else "1"
-                
-                                  
-                output_p = re.sub(r'[^\w]', '_', output_p)
-                output_n = re.sub(r'[^\w]', '_', output_n)
-                vcontrol = re.sub(r'[^\w]', '_', vcontrol)
-                
-                value = preserve_symbol(value)
-                
-                lines.append(f"{component} {output_p} {output_n} {vcontrol} {value}")
-            else:
-                continue
-        elif component.upper().startswith('H'):
-                                                    
-            if len(parts) >= 4:
-                output_p, output_n = parts[1], parts[2]
-                vcontrol = parts[3]
-                value = parts[4] if len(parts) > 4 else "1"
-                
-                                  
-                output_p = re.sub(r'[^\w]', '_', output_p)
-                output_n = re.sub(r'[^\w]', '_', output_n)
-                vcontrol = re.sub(r'[^\w]', '_', vcontrol)
-                
-                value = preserve_symbol(value)
-                
-                lines.append(f"{component} {output_p} {output_n} {vcontrol} {value}")
-            else:
-                continue
         else:
-                                                       
-            node1, node2 = parts[1], parts[2]
-            value = parts[3]
-            
-                                                                              
-            node1 = re.sub(r'[^\w]', '_', node1)
-            node2 = re.sub(r'[^\w]', '_', node2)
-            
-                                                                                         
             if component.startswith('V_meas') or component.startswith('VI'):
                 logger.warning(f"Found measurement component {component} in supposedly converted netlist")
                 continue
             
-                                 
+            value = parts[3]
             if value == '<Empty>':
                 value = component
-            
-                                                                                   
-            if component.upper().startswith('V') and value.lower() in ['dc', 'ac']:
-                tail = ' '.join(parts[3:])
-                lines.append(f"{component} {node1} {node2} {tail}")
-            else:
-                lines.append(f"{component} {node1} {node2} {value}")
+            elif ctype == 'V' and value.lower() in ('dc', 'ac'):
+                # keep the full source specification
+                value = ' '.join(parts[3:])
+        
+        lines.append(_TEMPLATES.get(ctype, _TWO_TERMINAL_TEMPLATE).format(
+            c=component, n=nodes, value=value, ac_gain=ac_gain))
     
     return '\n'.join(lines)
 
-def find_voltage_sources(circuit):
+def find_sources_and_components(circuit):
+    """Split circuit elements into (voltage_sources, components) in one pass."""
     voltage_sources = []
-    for name, element in circuit.elements.items():
-        if name.startswith('V') and not name.startswith('V_meas'):
-            nodes = [str(n) for n in element.nodes]
-            voltage_sources.append((name, tuple(nodes)))
-    return voltage_sources
-
-def find_components(circuit):
     components = []
     for name, element in circuit.elements.items():
-        if not name.startswith('V'):
+        if name.startswith('V'):
+            if not name.startswith('V_meas'):
+                voltage_sources.append((name, tuple(str(n) for n in element.nodes)))
+        else:
             components.append(name)
-    return components
+    return voltage_sources, components
+
+def find_voltage_sources(circuit):
+    return find_sources_and_components(circuit)[0]
+
+def find_components(circuit):
+    return find_sources_and_components(circuit)[1]
+
+def _netlist_from_result(result, use_converted_netlists):
+    """Pick the netlist to analyze from one entry of a 'results' list."""
+    circuit_id = result.get('circuit_id')
+    
+    if use_converted_netlists and 'cleaned_netlist' in result:
+                                           
+        netlist = result['cleaned_netlist']
+        logger.debug(f"Using converted netlist for {circuit_id}")
+    elif 'original_netlist_with_measurements' in result:
+        original = result['original_netlist_with_measurements']
+        netlist = convert_netlist_remove_n_nodes(original)
+        logger.debug(f"Converting netlist for {circuit_id}")
+    elif 'cleaned_netlist' in result:
+        original = result['cleaned_netlist']
+        if 'N' in original and ('V_meas' in original or 'VI' in original):
+            netlist = convert_netlist_remove_n_nodes(original)
+            logger.debug(f"Converting fallback netlist for {circuit_id}")
+        else:
+            netlist = original
+            logger.debug(f"Using existing clean netlist for {circuit_id}")
+    else:
+        logger.warning(f"No suitable netlist found for {circuit_id}")
+        return circuit_id, None
+    return circuit_id, netlist
+
+def _netlist_from_entry(circuit_id, netlist, use_converted_netlists):
+    """Prepare the netlist of one {circuit_id: netlist} entry."""
+    if use_converted_netlists:
+                                       
+        if 'N' in netlist and ('V_meas' in netlist or 'VI' in netlist):
+            netlist = convert_netlist_remove_n_nodes(netlist)
+            logger.debug(f"Converting netlist for {circuit_id}")
+        else:
+            logger.debug(f"Using existing clean netlist for {circuit_id}")
+    return netlist
 
-def load_circuit_data(data_source, use_converted_netlists=True):
+def _stream_circuit_data(data_path, use_converted_netlists, max_circuits):
+    """Incrementally parse a JSON file with ijson, stopping after max_circuits."""
+    circuits = {}
+    with open(data_path, 'rb') as f:
+        for result in ijson.items(f, 'results.item'):
+            circuit_id, netlist = _netlist_from_result(result, use_converted_netlists)
+            if circuit_id and netlist:
+                circuits[circuit_id] = netlist
+                if max_circuits is not None and len(circuits) >= max_circuits:
+                    return circuits
+    if circuits:
+        return circuits
+    
+    # No 'results' entries: either a plain {circuit_id: netlist} mapping or an empty results list
+    with open(data_path, 'rb') as f:
+        for circuit_id, netlist in ijson.kvitems(f, ''):
+            if circuit_id == 'results':
+                return {}
+            if not isinstance(netlist, str):
+                logger.warning(f"Skipping {circuit_id}: netlist is not a string")
+                continue
+            circuits[circuit_id] = _netlist_from_entry(circuit_id, netlist, use_converted_netlists)
+            if max_circuits is not None and len(circuits) >= max_circuits:
+                break
+    return circuits
+
+def load_circuit_data(data_source, use_converted_netlists=True, max_circuits=None):
     """Load circuit data from JSON file or dict.
     
+    Files are parsed incrementally with ijson when it is installed, so only
+    the first max_circuits entries are read.
+    
     Args:
         data_source: Path to JSON file or dict with circuit data
         use_converted_netlists: Whether to use converted netlists without N-nodes
+        max_circuits: Stop after this many circuits (default: load all)
     
     Returns:
         Dictionary mapping circuit IDs to netlists
@@ -436,9 +670,14 @@ def load_circuit_data(data_source, use_converted_netlists=True):
         data_path = Path(data_source)
         if not data_path.exists():
             raise FileNotFoundError(f"File not found: {data_path}")
+        
+        if ijson is not None:
+            circuits = _stream_circuit_data(data_path, use_converted_netlists, max_circuits)
+            logger.info(f"Loaded {len(circuits)} circuits (converted N-nodes: {use_converted_netlists})")
+            return circuits
             
-        with open(data_path, 'r') as f:
-            data = json.load(f)
+        with open(data_path, 'rb') as f:
+            data = _json_loads(f.read())
     else:
         data = data_source
     
@@ -447,50 +686,32 @@ def load_circuit_data(data_source, use_converted_netlists=True):
                                       
     if 'results' in data:
                                                 
-        results = data['results']
-        for result in results:
-            circuit_id = result.get('circuit_id')
-            
-            if use_converted_netlists and 'cleaned_netlist' in result:
-                                                   
-                netlist = result['cleaned_netlist']
-                logger.debug(f"Using converted netlist for {circuit_id}")
-            elif 'original_netlist_with_measurements' in result:
-                original = result['original_netlist_with_measurements']
-                netlist = convert_netlist_remove_n_nodes(original)
-                logger.debug(f"Converting netlist for {circuit_id}")
-            elif 'cleaned_netlist' in result:
-                original = result['cleaned_netlist']
-                if 'N' in original and ('V_meas' in original or 'VI' in original):
-                    netlist = convert_netlist_remove_n_nodes(original)
-                    logger.debug(f"Converting fallback netlist for {circuit_id}")
-                else:
-                    netlist = original
-                    logger.debug(f"Using existing clean netlist for {circuit_id}")
-            else:
-                logger.warning(f"No suitable netlist found for {circuit_id}")
-                continue
-                
+        for result in data['results']:
+            circuit_id, netlist = _netlist_from_result(result, use_converted_netlists)
             if circuit_id and netlist:
                 circuits[circuit_id] = netlist
+                if max_circuits is not None and len(circuits) >= max_circuits:
+                    break
                 
     elif isinstance(data, dict):
                                                           
         for circuit_id, netlist in data.items():
-            if use_converted_netlists:
-                                               
-                if 'N' in netlist and ('V_meas' in netlist or 'VI' in netlist):
-                    netlist = convert_netlist_remove_n_nodes(netlist)
-                    logger.debug(f"Converting netlist for {circuit_id}")
-                else:
-                    logger.debug(f"Using existing clean netlist for {circuit_id}")
-            circuits[circuit_id] = netlist
+            if not isinstance(netlist, str):
+                logger.warning(f"Skipping {circuit_id}: netlist is not a string")
+                continue
+            circuits[circuit_id] = _netlist_from_entry(circuit_id, netlist, use_converted_netlists)
+            if max_circuits is not None and len(circuits) >= max_circuits:
+                break
     else:
         raise ValueError("Unknown data format")
     
     logger.info(f"Loaded {len(circuits)} circuits (converted N-nodes: {use_converted_netlists})")
     return circuits
 
+# Node-count bands for MNA: solve tiny systems directly, don't attempt large ones
+_MNA_DIRECT_MAX_NODES = 3
+_MNA_SKIP_MIN_NODES = 12
+
 def analyze_circuit(netlist, circuit_id):
     """Analyze a circuit netlist and extract symbolic equations.
     
@@ -510,14 +731,20 @@ def analyze_circuit(netlist, circuit_id):
             return {'circuit_id': circuit_id, 'error': 'No components after cleaning netlist'}
             
                                               
-        lines = [line for line in cleaned.split('\n') if line.strip()]
-        num_components = len(lines)
-        
-                                                                   
-        num_capacitors = len([line for line in lines if line.startswith('C')])
-        num_inductors = len([line for line in lines if line.startswith('L')])
-        num_opamps = len([line for line in lines if line.startswith('E')])
-        num_nodes = len(set(node for line in lines for node in line.split()[1:3] if node != '0'))
+        # one pass over the cleaned lines for the type counts and the node set
+        first_chars = Counter()
+        nodes = set()
+        for line in cleaned.split('\n'):
+            if not line.strip():
+                continue
+            first_chars[line[0]] += 1
+            nodes.update(line.split()[1:3])
+        nodes.discard('0')
+        num_components = sum(first_chars.values())
+        num_capacitors = first_chars['C']
+        num_inductors = first_chars['L']
+        num_opamps = first_chars['E']
+        num_nodes = len(nodes)
         
                                     
         complexity_score = num_components + num_capacitors * 2 + num_inductors * 2 + num_opamps * 3
@@ -543,15 +770,20 @@ def analyze_circuit(netlist, circuit_id):
         
         logger.debug(f"Creating lcapy circuit for {circuit_id}...")
         try:
-            circuit = Circuit(cleaned)
+            circuit = _build_circuit(cleaned)
         except Exception as e:
             logger.error(f"Failed to create lcapy circuit for {circuit_id}: {e}")
             return {'circuit_id': circuit_id, 'error': f'Circuit creation failed: {str(e)}'}
         
+        # MNA dimension without ground; fall back to the netlist node scan
+        try:
+            mna_nodes = len(circuit.node_map) - 1
+        except Exception:
+            mna_nodes = num_nodes
+        
         logger.debug(f"Finding voltage sources and components for {circuit_id}...")
         try:
-            voltage_sources = find_voltage_sources(circuit)
-            components = find_components(circuit)
+            voltage_sources, components = find_sources_and_components(circuit)
         except Exception as e:
             logger.error(f"Failed to analyze circuit elements for {circuit_id}: {e}")
             return {'circuit_id': circuit_id, 'error': f'Element analysis failed: {str(e)}'}
@@ -604,7 +836,7 @@ def analyze_circuit(netlist, circuit_id):
             logger.debug(f"Analyzing transfer function {i+1}/{max_transfer_functions}: {vs_name} -> {comp}")
             tf_result = safe_computation_mp(
                 _compute_transfer_function,
-                (circuit, vs_nodes, comp),
+                (cleaned, vs_nodes, comp),
                 timeout_seconds=timeout_tf,
                 description=f"transfer function {vs_name} -> {comp}"
             )
@@ -615,34 +847,34 @@ def analyze_circuit(netlist, circuit_id):
                 result['transfer_functions'][f"{vs_name}_to_{comp}"] = "TIMEOUT_OR_ERROR"
                 logger.warning(f"Transfer function timed out or failed for {circuit_id}")
         
-        if any(v != "TIMEOUT_OR_ERROR" for v in result['transfer_functions'].values()):
-            logger.debug("Attempting T-domain MNA equations...")
-            mna_t = safe_computation_mp(
-                _compute_mna_analysis,
-                (circuit, 't'),
-                timeout_seconds=timeout_nodal,
-                description="T-domain MNA equations"
-            )
-            if mna_t is not None:
-                result['nodal_equations']['t_domain'] = mna_t
-                logger.debug(f"T-domain MNA equations success for {circuit_id}")
-            else:
-                result['nodal_equations']['t_domain'] = "TIMEOUT_OR_ERROR"
-                logger.warning(f"T-domain MNA equations timed out or failed for {circuit_id}")
-                
-            logger.debug("Attempting S-domain MNA equations...")
-            mna_s = safe_computation_mp(
-                _compute_mna_analysis,
-                (circuit, 's'),
-                timeout_seconds=timeout_nodal,
-                description="S-domain MNA equations"
-            )
-            if mna_s is not None:
-                result['nodal_equations']['s_domain'] = mna_s
-                logger.debug(f"S-domain MNA equations success for {circuit_id}")
+        has_transfer_functions = any(v != "TIMEOUT_OR_ERROR" for v in result['transfer_functions'].values())
+        if has_transfer_functions and mna_nodes >= _MNA_SKIP_MIN_NODES:
+            logger.debug(f"Skipping MNA analysis ({mna_nodes} nodes)")
+            result['nodal_equations']['t_domain'] = "SKIPPED_TOO_LARGE"
+            result['nodal_equations']['s_domain'] = "SKIPPED_TOO_LARGE"
+        elif has_transfer_functions:
+            logger.debug("Attempting T- and S-domain MNA equations...")
+            if mna_nodes <= _MNA_DIRECT_MAX_NODES:
+                # small systems finish quickly; skip the timeout machinery
+                mna_results = _compute_mna_analysis_both(cleaned)
             else:
-                result['nodal_equations']['s_domain'] = "TIMEOUT_OR_ERROR"
-                logger.warning(f"S-domain MNA equations timed out or failed for {circuit_id}")
+                # separate budgets, so an s-domain timeout doesn't discard the t-domain result
+                mna_results = tuple(
+                    safe_computation_mp(
+                        _compute_mna_analysis,
+                        (cleaned, domain),
+                        timeout_seconds=timeout_nodal,
+                        description=f"{domain.upper()}-domain MNA equations"
+                    )
+                    for domain in ('t', 's')
+                )
+            for domain, label, idx in (('t', 'T', 0), ('s', 'S', 1)):
+                if mna_results[idx] is not None:
+                    result['nodal_equations'][f'{domain}_domain'] = mna_results[idx]
+                    logger.debug(f"{label}-domain MNA equations success for {circuit_id}")
+                else:
+                    result['nodal_equations'][f'{domain}_domain'] = "TIMEOUT_OR_ERROR"
+                    logger.warning(f"{label}-domain MNA equations timed out or failed for {circuit_id}")
         else:
             logger.debug("Skipping MNA analysis (no successful transfer functions)")
             result['nodal_equations']['t_domain'] = "SKIPPED_NO_TRANSFER_FUNCTIONS"
@@ -654,6 +886,44 @@ def analyze_circuit(netlist, circuit_id):
         logger.error(f"Circuit {circuit_id} failed with exception: {e}", exc_info=True)
         return {'circuit_id': circuit_id, 'error': f'Exception: {str(e)}'}
 
+def _analyze_one(item):
+    circuit_id, netlist = item
+    return circuit_id, analyze_circuit(netlist, circuit_id)
+
+def _iter_analyses(circuit_items, workers=1):
+    """Yield (circuit_id, result) in input order, across `workers` processes when > 1."""
+    total = len(circuit_items)
+    if workers <= 1 or total <= 1:
+        for i, (circuit_id, netlist) in enumerate(circuit_items, 1):
+            logger.info(f"[{i}/{total}] Processing {circuit_id}...")
+            yield circuit_id, analyze_circuit(netlist, circuit_id)
+        return
+    
+    logger.info(f"Analyzing on {workers} worker processes")
+    chunksize = max(1, total // (4 * workers))
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+    initargs = (multiprocessing.Value('i', 0), cpus)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker, initargs=initargs) as executor:
+        for i, (circuit_id, result) in enumerate(executor.map(_analyze_one, circuit_items, chunksize=chunksize), 1):
+            logger.info(f"[{i}/{total}] Processed {circuit_id}")
+            yield circuit_id, result
+
+def write_json_output(data, output_file, pretty=False, compress=False):
+    """Write data as JSON (compact unless pretty), gzipped to `<output_file>.gz` if compress.
+    
+    Returns:
+        Path of the written file
+    """
+    payload = _json_dumps(data, indent=pretty)
+    if compress:
+        output_path = Path(f"{output_file}.gz")
+        with gzip.open(output_path, 'wb') as f:
+            f.write(payload)
+    else:
+        output_path = Path(output_file)
+        output_path.write_bytes(payload)
+    return output_path
+
 def run_analysis(args):
     """Run circuit analysis with given arguments.
     
@@ -675,7 +945,8 @@ def run_analysis(args):
         return 1
     
     try:
-        circuits = load_circuit_data(data_file, use_converted_netlists=args.use_converted_netlists)
+        circuits = load_circuit_data(data_file, use_converted_netlists=args.use_converted_netlists,
+                                     max_circuits=args.max_circuits)
     except Exception as e:
         logger.error(f"Failed to load circuit data: {e}")
         return 1
@@ -693,23 +964,37 @@ def run_analysis(args):
     logger.info(f"Fast mode: {'ON' if args.fast_mode else 'OFF'}")
     
     error_types = {}
+    timeout_count = 0
+    total_tf_success = 0
+    total_mna_success = 0
+    complexity_scores = []
     
-    for i, (circuit_id, netlist) in enumerate(circuit_items, 1):
-        logger.info(f"[{i}/{len(circuit_items)}] Processing {circuit_id}...")
-        
-        result = analyze_circuit(netlist, circuit_id)
-        
+    for circuit_id, result in _iter_analyses(circuit_items, getattr(args, 'workers', 1)):
         if result is None:
             failed += 1
             logger.error(f"{circuit_id} - Analysis returned None")
-        elif result.get('skipped', False):
+            continue
+        
+        results.append(result)
+        tf_values = result.get('transfer_functions', {}).values()
+        mna_values = result.get('nodal_equations', {}).values()
+        tf_success = sum(1 for v in tf_values if v not in SENTINELS)
+        mna_success = sum(1 for v in mna_values if v not in SENTINELS)
+        total_tf_success += tf_success
+        total_mna_success += mna_success
+        # sentinels are stored verbatim, so compare rather than stringify each expression
+        if any(v == "TIMEOUT_OR_ERROR" for v in tf_values) or \
+                any(v == "TIMEOUT_OR_ERROR" for v in mna_values):
+            timeout_count += 1
+        if 'complexity_metrics' in result:
+            complexity_scores.append(result['complexity_metrics'].get('complexity_score', 0))
+        
+        if result.get('skipped', False):
             skipped += 1
-            results.append(result)
             reason = result.get('reason', 'Unknown')
             logger.info(f"{circuit_id} - Skipped: {reason}")
         elif 'error' in result:
             failed += 1
-            results.append(result)
             error_msg = result['error']
             
             error_key = error_msg.split(':')[0] if ':' in error_msg else error_msg[:50]
@@ -718,50 +1003,28 @@ def run_analysis(args):
             logger.warning(f"{circuit_id} - Error: {error_msg}")
         else:
             successful += 1
-            results.append(result)
             
             metrics = result.get('complexity_metrics', {})
             score = metrics.get('complexity_score', 0)
             nodes = metrics.get('num_nodes', 0)
             
-            tf_success = sum(1 for v in result.get('transfer_functions', {}).values() 
-                           if v not in ["TIMEOUT_OR_ERROR", "SKIPPED_TOO_COMPLEX", "SKIPPED_NO_TRANSFER_FUNCTIONS"])
-            mna_success = sum(1 for v in result.get('nodal_equations', {}).values() 
-                            if v not in ["TIMEOUT_OR_ERROR", "SKIPPED_TOO_COMPLEX", "SKIPPED_NO_TRANSFER_FUNCTIONS"])
-            
             logger.info(f"{circuit_id} - Success (complexity: {score}, nodes: {nodes}, TF: {tf_success}, MNA: {mna_success})")
             
             if args.show_samples and 'transfer_functions' in result:
                 for tf_name, tf_expr in result['transfer_functions'].items():
-                    if tf_expr not in ["TIMEOUT_OR_ERROR", "SKIPPED_TOO_COMPLEX", "SKIPPED_NO_TRANSFER_FUNCTIONS"]:
+                    if tf_expr not in SENTINELS:
                         logger.info(f"  Sample: {tf_name}: {tf_expr}")
                         break
     
-    timeout_count = sum(1 for r in results 
-                       if any('TIMEOUT_OR_ERROR' in str(v) 
-                             for v in r.get('transfer_functions', {}).values()) or
-                          any('TIMEOUT_OR_ERROR' in str(v)
-                             for v in r.get('nodal_equations', {}).values()))
-    
-    skipped_complex = sum(1 for r in results if r.get('skipped', False))
-    
-    if results:
-        complexity_scores = [r.get('complexity_metrics', {}).get('complexity_score', 0) 
-                           for r in results if 'complexity_metrics' in r]
-        if complexity_scores:
-            avg_complexity = sum(complexity_scores) / len(complexity_scores)
-            max_complexity = max(complexity_scores)
-            min_complexity = min(complexity_scores)
-        else:
-            avg_complexity = max_complexity = min_complexity = 0
+    skipped_complex = skipped
+    if complexity_scores:
+        scores = np.asarray(complexity_scores)
+        avg_complexity = scores.mean().item()
+        max_complexity = scores.max().item()
+        min_complexity = scores.min().item()
     else:
         avg_complexity = max_complexity = min_complexity = 0
     
-    total_tf_success = sum(1 for r in results for v in r.get('transfer_functions', {}).values() 
-                          if v not in ["TIMEOUT_OR_ERROR", "SKIPPED_TOO_COMPLEX", "SKIPPED_NO_TRANSFER_FUNCTIONS"])
-    total_mna_success = sum(1 for r in results for v in r.get('nodal_equations', {}).values() 
-                           if v not in ["TIMEOUT_OR_ERROR", "SKIPPED_TOO_COMPLEX", "SKIPPED_NO_TRANSFER_FUNCTIONS"])
-    
     output = {
         'summary': {
             'total_circuits': len(circuit_items),
@@ -793,8 +1056,9 @@ def run_analysis(args):
         'results': results
     }
     
-    with open(args.output_file, 'w') as f:
-        json.dump(output, f, indent=2)
+    output_path = write_json_output(output, args.output_file,
+                                    pretty=getattr(args, 'pretty', False),
+                                    compress=getattr(args, 'gzip', False))
     
     logger.info("Final Analysis Summary:")
     logger.info(f"   Successful circuits: {successful}")
@@ -812,7 +1076,7 @@ def run_analysis(args):
         for error_type, count in sorted(error_types.items(), key=lambda x: x[1], reverse=True):
             logger.info(f"   • {error_type}: {count}")
     
-    logger.info(f"Results saved to {args.output_file}")
+    logger.info(f"Results saved to {output_path}")
     return 0
 
 
@@ -826,6 +1090,14 @@ def main():
     parser.add_argument('--show_samples', action='store_true', help='Show sample equations during analysis')
     parser.add_argument('--max_components', type=int, default=21, help='Skip circuits with more than this many components (increased default)')
     parser.add_argument('--fast_mode', action='store_true', help='Use shorter timeouts for faster processing')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of circuits to analyze in parallel (default: 1)')
+    parser.add_argument('--compact', dest='pretty', action='store_false', default=False,
+                       help='Write compact JSON without indentation (default)')
+    parser.add_argument('--pretty', dest='pretty', action='store_true',
+                       help='Indent the output JSON for reading')
+    parser.add_argument('--gzip', action='store_true',
+                       help='Gzip the output (written to <output_file>.gz)')
     parser.add_argument('--use_converted_netlists', action='store_true', default=True,
                        help='Use converted netlists without N-nodes (default: True)')
     parser.add_argument('--converted_file', 
@@ -837,7 +1109,10 @@ def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    return run_analysis(args)
+    try:
+        return run_analysis(args)
+    finally:
+        _shutdown_pool()
 
 if __name__ == "__main__":
     import sys
@@ -2,25 +2,64 @@
 
    
 
-import json
+import atexit
+import gzip
+import hashlib
 import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 import numpy as np
-
-                                        
-sys.path.append('utils/simulation')
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice
 import tempfile
 import os
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Add repo root to path for imports
+repo_root = Path(__file__).resolve().parent.parent
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from utils.fastjson import dumps as _dumps, loads as _loads  # noqa: E402
+
+                                        
+sys.path.append('utils/simulation')
+
+_CONTROL_RE = re.compile(r'\.control\s*\n(.*?)\n\.endc', re.DOTALL | re.IGNORECASE)
+_PRINT_RE = re.compile(r'print\s+([^;]+)\s*;\s*measurement\s+of\s+(.+)', re.IGNORECASE)
+_TRAN_RE = re.compile(r'\btran\s+[^\n]*', re.IGNORECASE)
+_CONTROL_SPLIT_RE = re.compile(r'(?i)\.control')
+_WS_RE = re.compile(r'\s+')
+_VALUE_PATTERN = rb'\s*=\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)'
+
+# Resolved once; None when ngspice isn't installed
+NGSPICE = shutil.which('ngspice')
+# Seconds ngspice may spend on one deck (and on a whole batch, see _run_deck_batch)
+SIM_TIMEOUT = 60
+
 def parse_control_block(netlist: str) -> List[Dict[str, str]]:    
+    return [
+        {'command': command, 'measurement_variable': measurement_var, 'full_line': line}
+        for command, measurement_var, line in _parse_control_block(netlist)
+    ]
+
+@lru_cache(maxsize=4096)
+def _parse_control_block(netlist: str) -> Tuple[Tuple[str, str, str], ...]:
+    # memoized as immutable tuples; parse_control_block hands out fresh dicts
     measurements = []
                  
-    control_match = re.search(r'\.control\s*\n(.*?)\n\.endc', netlist, re.DOTALL | re.IGNORECASE)
+    control_match = _CONTROL_RE.search(netlist)
     if not control_match:
-        return measurements
+        return ()
     
     control_content = control_match.group(1)
     
@@ -32,18 +71,14 @@ def parse_control_block(netlist: str) -> List[Dict[str, str]]:
         if not line or line == 'op':
             continue
                                            
-        print_match = re.match(r'print\s+([^;]+)\s*;\s*measurement\s+of\s+(.+)', line, re.IGNORECASE)
+        print_match = _PRINT_RE.match(line)
         if print_match:
             command = print_match.group(1).strip()
             measurement_var = print_match.group(2).strip()
             
-            measurements.append({
-                'command': command,
-                'measurement_variable': measurement_var,
-                'full_line': line
-            })
+            measurements.append((command, measurement_var, line))
     
-    return measurements
+    return tuple(measurements)
 
 def generate_questions_from_measurements(measurements: List[Dict[str, str]], circuit_id: str) -> List[Dict[str, str]]:
    
@@ -90,90 +125,153 @@ def generate_questions_from_measurements(measurements: List[Dict[str, str]], cir
     
     return questions
 
-def simulate_circuit_for_answers(original_netlist: str, measurements: List[Dict[str, str]]) -> Dict[str, float]:
+def _scan_printed_values(output: bytes, print_cmds: List[str]) -> Dict[str, str]:
+    """Scan raw ngspice output once for `<cmd> = <value>` lines, keyed by lower-cased command.
+
+    Only the matched names and numbers are decoded, not the whole output.
+    """
+    names = {_WS_RE.sub('', cmd).encode() for cmd in print_cmds}
+    if not names:
+        return {}
+    alternatives = b'|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    # zero-width lookahead so overlapping names are all found at their first occurrence
+    pattern = re.compile(rb"(?=(" + alternatives + rb")" + _VALUE_PATTERN + rb")", re.IGNORECASE)
+    values: Dict[str, str] = {}
+    for match in pattern.finditer(output):
+        values.setdefault(match.group(1).decode().lower(), match.group(2).decode())
+    return values
+
+def _build_simulation_deck(original_netlist: str, measurements: List[Dict[str, str]]) -> Tuple[str, List[Tuple[str, str, int]]]:
+    """Build the ngspice deck printing every measurement, plus its (orig_cmd, print_cmd, sign) list."""
+                                                          
+    tran_match = _TRAN_RE.search(original_netlist)
+    is_transient = tran_match is not None
+    tran_line = tran_match.group(0).strip() if tran_match else ''
+                                                           
+    parts = _CONTROL_SPLIT_RE.split(original_netlist, maxsplit=1)
+    components_part = parts[0].rstrip()                                        
+
+    if not components_part.strip():
+                                                                   
+        components_part = original_netlist.strip()
+                                                           
+    control_lines = [".control"]
+    if is_transient:
+        control_lines.append(tran_line)
+    else:
+        control_lines.append("op")
+                                          
+    mapped_commands: List[Tuple[str, str, int]] = []
+
+    for meas in measurements:
+        orig_cmd = meas['command'].strip()
+        sign = 1
+        if orig_cmd.startswith('-'):
+            sign = -1
+            base_cmd = orig_cmd[1:].strip()
+        else:
+            base_cmd = orig_cmd
 
-    answers: Dict[str, float] = {}
-    try:
-                                                              
-        tran_match = re.search(r'\btran\s+[^\n]*', original_netlist, re.IGNORECASE)
-        is_transient = tran_match is not None
-        tran_line = tran_match.group(0).strip() if tran_match else ''
-                                                               
-        parts = re.split(r'(?i)\.control', original_netlist, maxsplit=1)
-        components_part = parts[0].rstrip()                                        
-
-        if not components_part.strip():
-                                                                       
-            components_part = original_netlist.strip()
-                                                               
-        control_lines = [".control"]
         if is_transient:
-            control_lines.append(tran_line)
+                                                                      
+            print_cmd = _WS_RE.sub('', base_cmd) + '[-1]'
         else:
-            control_lines.append("op")
-                                              
-        mapped_commands: Dict[str, Tuple[str, int]] = {}
+            print_cmd = base_cmd
 
-        for meas in measurements:
-            orig_cmd = meas['command'].strip()
-            sign = 1
-            if orig_cmd.startswith('-'):
-                sign = -1
-                base_cmd = orig_cmd[1:].strip()
-            else:
-                base_cmd = orig_cmd
+        mapped_commands.append((orig_cmd, print_cmd, sign))
+        control_lines.append(f"print {print_cmd}")
 
-            if is_transient:
-                                                                          
-                print_cmd = re.sub(r'\s+', '', base_cmd) + '[-1]'
-            else:
-                print_cmd = base_cmd
+    control_lines.append(".endc")
 
-            mapped_commands[orig_cmd] = (print_cmd, sign)
-            control_lines.append(f"print {print_cmd}")
+    full_netlist = components_part + "\n\n" + "\n".join(control_lines) + "\n.end\n"
+    return full_netlist, mapped_commands
 
-        control_lines.append(".endc")
+def _answers_from_output(output: bytes, mapped_commands: List[Tuple[str, str, int]]) -> Dict[str, float]:
+    """Signed measurement values printed in ngspice output, None where missing."""
+    answers: Dict[str, float] = {}
+    values = _scan_printed_values(output, [print_cmd for _, print_cmd, _ in mapped_commands])
+    for orig_cmd, print_cmd, sign in mapped_commands:
+        value = values.get(_WS_RE.sub('', print_cmd).lower())
+        if value is not None:
+            try:
+                answers[orig_cmd] = float(value) * sign
+            except ValueError:
+                answers[orig_cmd] = None
+        else:
+            answers[orig_cmd] = None
+    return answers
 
-                       
-        full_netlist = components_part + "\n\n" + "\n".join(control_lines) + "\n.end\n"
+_sim_tmp = threading.local()
+
+def _sim_tmp_dir() -> Path:
+    """Scratch directory for this thread's ngspice decks, reused across calls and removed at exit."""
+    tmp_dir = getattr(_sim_tmp, 'path', None)
+    if tmp_dir is None:
+        tmp_dir = _sim_tmp.path = Path(tempfile.mkdtemp(prefix='qa_sim_'))
+        atexit.register(shutil.rmtree, tmp_dir, ignore_errors=True)
+    return tmp_dir
+
+# Default on-disk cache of simulation answers, keyed by netlist and measurements
+SIM_CACHE_DIR = Path('.cache') / 'qa_sim'
+
+def _sim_cache_path(cache_dir: Path, original_netlist: str, measurements: List[Dict[str, str]]) -> Path:
+    key = hashlib.blake2b(original_netlist.encode(), digest_size=16)
+    for meas in measurements:
+        key.update(b'\0' + meas['command'].encode())
+    return cache_dir / f"{key.hexdigest()}.json"
+
+def _load_cached_answers(cache_dir: Optional[Path], original_netlist: str,
+                         measurements: List[Dict[str, str]]) -> Optional[Dict[str, float]]:
+    if cache_dir is None:
+        return None
+    try:
+        return _loads(_sim_cache_path(cache_dir, original_netlist, measurements).read_bytes())
+    except (OSError, ValueError):
+        return None
+
+def _store_cached_answers(cache_dir: Optional[Path], original_netlist: str,
+                          measurements: List[Dict[str, str]], answers: Dict[str, float]) -> None:
+    # only successful simulations are cached so failures are retried next run
+    if cache_dir is None or all(v is None for v in answers.values()):
+        return
+    path = _sim_cache_path(cache_dir, original_netlist, measurements)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(_dumps(answers))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def simulate_circuit_for_answers(original_netlist: str, measurements: List[Dict[str, str]],
+                                 cache_dir: Optional[Path] = None) -> Dict[str, float]:
+
+    cached = _load_cached_answers(cache_dir, original_netlist, measurements)
+    if cached is not None:
+        return cached
+
+    answers: Dict[str, float] = {}
+    try:
+        if NGSPICE is None:
+            raise FileNotFoundError("ngspice not found on PATH")
+        full_netlist, mapped_commands = _build_simulation_deck(original_netlist, measurements)
                                                                 
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.cir', delete=False) as tmp_file:
-            tmp_file.write(full_netlist)
-            tmp_filename = tmp_file.name
-        
-        try:
-            result = subprocess.run(
-                ['ngspice', '-b', tmp_filename],
-                capture_output=True,
-                text=True,
-                timeout=60                                            
-            )
+        deck_path = _sim_tmp_dir() / 'qa_sim.cir'
+        deck_path.write_bytes(full_netlist.encode())
+        result = subprocess.run(
+            [NGSPICE, '-b', str(deck_path)],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=SIM_TIMEOUT
+        )
 
-            output_text = result.stdout
-                                                      
-            for orig_cmd, (print_cmd, sign) in mapped_commands.items():
-                                                       
-                pattern_cmd = re.sub(r'\s+', '', print_cmd, flags=re.IGNORECASE)
-                                                                           
-                pattern = rf"{re.escape(pattern_cmd)}\s*=\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)"
-                match = re.search(pattern, output_text, re.IGNORECASE)
-                
-                if match:
-                    try:
-                        value = float(match.group(1)) * sign
-                        answers[orig_cmd] = value
-                    except ValueError:
-                        answers[orig_cmd] = None
-                else:
-                    answers[orig_cmd] = None
-            
-                                                                              
-            if all(v is None for v in answers.values()) and result.returncode != 0:
-                print(f"  NgSpice error: {result.stderr}")
+        answers = _answers_from_output(result.stdout, mapped_commands)
         
-        finally:
-            if os.path.exists(tmp_filename):
-                os.unlink(tmp_filename)
+                                                                          
+        if all(v is None for v in answers.values()) and result.returncode != 0:
+            print(f"  NgSpice error: {result.stderr.decode(errors='replace')}")
+        else:
+            _store_cached_answers(cache_dir, original_netlist, measurements, answers)
                 
     except Exception as e:
         print(f"  Simulation error: {e}")
@@ -182,45 +280,178 @@ def simulate_circuit_for_answers(original_netlist: str, measurements: List[Dict[
     
     return answers
 
-def create_qa_dataset(analysis_file: str, output_file: str = None, max_circuits: int = None) -> Dict[str, Any]:
+# Circuits per ngspice process in simulate_circuits_batch
+SIM_BATCH_SIZE = 32
+_DECK_MARKER_RE = re.compile(rb'^=== deck (\d+) ===\s*$', re.MULTILINE)
+
+def _run_deck_batch(decks: List[Tuple[int, str, List[Tuple[str, str, int]]]]) -> Tuple[bytes, bool]:
+    """Run decks in one ngspice process, returning (stdout, timed_out).
+
+    The whole batch gets a single deck's SIM_TIMEOUT, so a hung deck costs
+    no more than it would on its own; on a timeout the output of the decks
+    that finished is still returned.
+    """
+    tmp_dir = _sim_tmp_dir()
+    script_lines = ["* batched QA simulations", ".control"]
+    for k, (_, full_netlist, _) in enumerate(decks):
+        deck_path = tmp_dir / f"deck{k}.cir"
+        deck_path.write_bytes(full_netlist.encode())
+        script_lines += [f'echo "=== deck {k} ==="', f"source {deck_path}", "remcirc"]
+    script_lines += [".endc", ".end"]
+    script_path = tmp_dir / "batch.cir"
+    script_path.write_bytes(("\n".join(script_lines) + "\n").encode())
+
+    try:
+        result = subprocess.run(
+            [NGSPICE, '-b', str(script_path)],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=SIM_TIMEOUT
+        )
+    except subprocess.TimeoutExpired as e:
+        return e.stdout or b'', True
+    return result.stdout, False
+
+def simulate_circuits_batch(circuits: List[Tuple[str, List[Dict[str, str]]]],
+                            cache_dir: Optional[Path] = None) -> List[Dict[str, float]]:
+    """Simulate (original_netlist, measurements) circuits in a single ngspice run, answers in input order.
+
+    Each circuit's deck is sourced from one control script that echoes a marker
+    before it, and the output is split on those markers. Circuits whose section
+    is missing or yields no values are re-simulated on their own. If the run
+    times out, the finished sections are kept, the deck that was running is
+    re-simulated on its own and the decks after it are batched again. With a
+    cache_dir, previously simulated circuits are answered from the cache.
+    """
+    answers: List[Optional[Dict[str, float]]] = [None] * len(circuits)
+    decks = []
+    for index, (original_netlist, measurements) in enumerate(circuits):
+        answers[index] = _load_cached_answers(cache_dir, original_netlist, measurements)
+        if answers[index] is not None:
+            continue
+        try:
+            decks.append((index, *_build_simulation_deck(original_netlist, measurements)))
+        except Exception:
+            continue
+
+    pending = decks
+    while len(pending) > 1 and NGSPICE is not None:
+        try:
+            stdout, timed_out = _run_deck_batch(pending)
+        except Exception as e:
+            print(f"  Batched simulation failed, falling back to per-circuit runs: {e}")
+            break
+
+        # re.split with one group gives [preamble, k0, section0, k1, section1, ...]
+        pieces = _DECK_MARKER_RE.split(stdout)
+        started = [int(k) for k in pieces[1::2]]
+        sections = dict(zip(started, pieces[2::2]))
+        if timed_out and started:
+            # the last deck to start was cut off mid-run; it is retried on its own below
+            del sections[started[-1]]
+        for k, (index, _, mapped_commands) in enumerate(pending):
+            if k not in sections:
+                continue
+            circuit_answers = _answers_from_output(sections[k], mapped_commands)
+            if any(v is not None for v in circuit_answers.values()):
+                answers[index] = circuit_answers
+                _store_cached_answers(cache_dir, *circuits[index], circuit_answers)
+
+        if not timed_out:
+            break
+        print(f"  Batched simulation timed out after {SIM_TIMEOUT}s ({len(sections)}/{len(pending)} decks finished)")
+        if not started:
+            break
+        # batch the decks that never started again; without any progress, run them one by one
+        pending = pending[started[-1] + 1:]
+
+    for index, (original_netlist, measurements) in enumerate(circuits):
+        if answers[index] is None:
+            answers[index] = simulate_circuit_for_answers(original_netlist, measurements, cache_dir)
+    return answers
+
+def load_successful_circuits(analysis_file: str, max_circuits: int = None) -> Optional[List[Dict[str, Any]]]:
+    """Successful circuit_results records (at most max_circuits), or None when the file has no circuit_results.
+
+    With ijson installed the circuit_results array is streamed and parsing stops
+    once max_circuits successful records are collected.
+    """
+    if ijson is None:
+        analysis_data = _loads(Path(analysis_file).read_bytes())
+        if 'circuit_results' not in analysis_data:
+            return None
+        successful = (result for result in analysis_data['circuit_results'] if result['status'] == 'success')
+        return list(islice(successful, max_circuits) if max_circuits else successful)
+
+    found = False
+
+    def _events(f):
+        nonlocal found
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == 'circuit_results' and event == 'start_array':
+                found = True
+            yield prefix, event, value
+
+    successful_circuits = []
+    with open(analysis_file, 'rb') as f:
+        for result in ijson.items(_events(f), 'circuit_results.item'):
+            if result['status'] != 'success':
+                continue
+            successful_circuits.append(result)
+            if max_circuits and len(successful_circuits) >= max_circuits:
+                break
+    return successful_circuits if found else None
+
+def iter_qa_questions(questions_file: str):
+    """Yield the question records of a JSONL QA dataset (gzipped if it ends in .gz)."""
+    opener = gzip.open if str(questions_file).endswith('.gz') else open
+    with opener(questions_file, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+
+def create_qa_dataset(analysis_file: str, output_file: str = None, max_circuits: int = None,
+                      max_workers: int = None, pretty: bool = False, compress: bool = False,
+                      use_cache: bool = True) -> Dict[str, Any]:
+    """Build the QA dataset from a circuit analysis file.
+
+    With an output_file, answered questions are streamed to it as JSON Lines
+    (to `<output_file>.gz` if compress) and the metadata goes to
+    `<output_file>.meta.json`; the returned dict then carries 'metadata' and
+    'questions_file' instead of holding every question in memory. Without
+    one, the answered questions are returned under 'questions'.
+
+    Questions only reference their circuit by 'circuit_id'; the netlists are
+    stored once per circuit in the 'circuits' mapping
+    ({circuit_id: {'cleaned': ..., 'original': ...}}), which is also written
+    to `<output_file>.circuits.json` (gzipped alongside the questions).
+    """
 
     print(f"Loading circuit analysis from {analysis_file}...")
     
-    with open(analysis_file, 'r') as f:
-        analysis_data = json.load(f)
-    
-                                    
-    successful_circuits = []
-    if 'circuit_results' in analysis_data:
-        successful_circuits = [
-            result for result in analysis_data['circuit_results'] 
-            if result['status'] == 'success'
-        ]
-    else:
+    successful_circuits = load_successful_circuits(analysis_file, max_circuits)
+    if successful_circuits is None:
         print("No circuit_results found in analysis file")
         return {}
     
-    if max_circuits:
-        successful_circuits = successful_circuits[:max_circuits]
-    
     print(f"Processing {len(successful_circuits)} successful circuits...")
     
-    qa_dataset = {
-        'metadata': {
-            'source_file': analysis_file,
-            'total_circuits': len(successful_circuits),
-            'total_questions': 0,
-            'successful_simulations': 0,
-            'failed_simulations': 0,
-            'description': 'Circuit analysis question-answering dataset'
-        },
-        'questions': []
+    metadata = {
+        'source_file': analysis_file,
+        'total_circuits': len(successful_circuits),
+        'total_questions': 0,
+        'successful_simulations': 0,
+        'failed_simulations': 0,
+        'description': 'Circuit analysis question-answering dataset'
     }
+    circuits: Dict[str, Dict[str, str]] = {}
+    qa_dataset: Dict[str, Any] = {'metadata': metadata, 'circuits': circuits}
     
+    batches: List[List[Tuple[Dict[str, Any], List[Dict[str, str]]]]] = []
+    pending = []
     for i, circuit_result in enumerate(successful_circuits):
         circuit_id = circuit_result['circuit_id']
         original_netlist = circuit_result['original_netlist']
-        cleaned_netlist = circuit_result['cleaned_netlist']
         
         print(f"Processing circuit {i+1}/{len(successful_circuits)}: {circuit_id}")
         
@@ -232,54 +463,91 @@ def create_qa_dataset(analysis_file: str, output_file: str = None, max_circuits:
             continue
         
         print(f"  Found {len(measurements)} measurements")
-        
-                            
-        questions = generate_questions_from_measurements(measurements, circuit_id)
-        
-                                                 
-        print(f"  Running simulation for ground truth...")
-        answers = simulate_circuit_for_answers(original_netlist, measurements)
-        
-                                        
-        simulation_success = True
-        for question in questions:
-            command = question['measurement_command']
-            answer_value = answers.get(command)
-            
-            if answer_value is not None:
-                question['answer'] = answer_value
-                question['answer_formatted'] = f"{answer_value:.6g} {question['unit']}"
-                question['has_answer'] = True
-            else:
-                question['answer'] = None
-                question['answer_formatted'] = "Simulation failed"
-                question['has_answer'] = False
-                simulation_success = False
-            
-                                 
-            question['circuit_netlist'] = cleaned_netlist
-            question['original_netlist'] = original_netlist
-            
-            qa_dataset['questions'].append(question)
-        
-        if simulation_success:
-            qa_dataset['metadata']['successful_simulations'] += 1
-        else:
-            qa_dataset['metadata']['failed_simulations'] += 1
+        pending.append((circuit_result, measurements))
+        if len(pending) == SIM_BATCH_SIZE:
+            batches.append(pending)
+            pending = []
+    if pending:
+        batches.append(pending)
     
+    if output_file:
+        questions_file = f"{output_file}.gz" if compress else output_file
+        out = gzip.open(questions_file, 'wb') if compress else open(questions_file, 'wb')
+        qa_dataset['questions_file'] = questions_file
+    else:
+        out = None
+        qa_dataset['questions'] = []
+    
+    total_count = 0
+    answered_count = 0
+    try:
+                                                 
+        print(f"Running simulations for ground truth ({len(batches)} batches)...")
+        # ngspice runs in subprocesses, so threads are enough to keep every core busy
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+            batch_results = executor.map(
+                partial(simulate_circuits_batch, cache_dir=SIM_CACHE_DIR if use_cache else None),
+                [[(c['original_netlist'], m) for c, m in batch] for batch in batches]
+            )
+            for batch, batch_answers in zip(batches, batch_results):
+                for (circuit_result, measurements), answers in zip(batch, batch_answers):
+                    circuit_id = circuit_result['circuit_id']
+                    original_netlist = circuit_result['original_netlist']
+                    cleaned_netlist = circuit_result['cleaned_netlist']
+                
+                                    
+                    questions = generate_questions_from_measurements(measurements, circuit_id)
+                
                                                 
-    original_count = len(qa_dataset['questions'])
-    qa_dataset['questions'] = [q for q in qa_dataset['questions'] if q['has_answer']]
-    filtered_count = len(qa_dataset['questions'])
+                    simulation_success = True
+                    for question in questions:
+                        command = question['measurement_command']
+                        answer_value = answers.get(command)
+                        total_count += 1
+                    
+                        if answer_value is None:
+                            # unanswered questions are left out of the dataset
+                            simulation_success = False
+                            continue
+                        
+                        question['answer'] = answer_value
+                        question['answer_formatted'] = f"{answer_value:.6g} {question['unit']}"
+                        question['has_answer'] = True
+                    
+                        if circuit_id not in circuits:
+                            circuits[circuit_id] = {'cleaned': cleaned_netlist, 'original': original_netlist}
+                    
+                        answered_count += 1
+                        if out is not None:
+                            out.write(_dumps(question))
+                            out.write(b'\n')
+                        else:
+                            qa_dataset['questions'].append(question)
+                
+                    if simulation_success:
+                        metadata['successful_simulations'] += 1
+                    else:
+                        metadata['failed_simulations'] += 1
+    finally:
+        if out is not None:
+            out.close()
     
-    qa_dataset['metadata']['total_questions'] = filtered_count
-    qa_dataset['metadata']['filtered_out_questions'] = original_count - filtered_count
+    metadata['total_questions'] = answered_count
+    metadata['filtered_out_questions'] = total_count - answered_count
     
                   
     if output_file:
-        with open(output_file, 'w') as f:
-            json.dump(qa_dataset, f, indent=2)
-        print(f"QA dataset saved to {output_file}")
+        meta_file = f"{output_file}.meta.json"
+        Path(meta_file).write_bytes(_dumps(metadata, indent=pretty))
+        circuits_file = f"{output_file}.circuits.json"
+        if compress:
+            circuits_file += '.gz'
+            with gzip.open(circuits_file, 'wb') as f:
+                f.write(_dumps(circuits, indent=pretty))
+        else:
+            Path(circuits_file).write_bytes(_dumps(circuits, indent=pretty))
+        qa_dataset['circuits_file'] = circuits_file
+        print(f"QA dataset saved to {qa_dataset['questions_file']} (metadata: {meta_file})")
     
     return qa_dataset
 
@@ -308,9 +576,14 @@ def show_dataset_examples(qa_dataset: Dict[str, Any], num_examples: int = 3):
     print(f"\n📝 EXAMPLE QUESTIONS")
     print("="*50)
     
-    valid_questions = [q for q in qa_dataset['questions'] if q['has_answer']]
+    if 'questions' in qa_dataset:
+        questions = qa_dataset['questions']
+    else:
+        # streamed datasets: read just the first few lines back
+        questions = iter_qa_questions(qa_dataset['questions_file'])
+    valid_questions = (q for q in questions if q['has_answer'])
     
-    for i, question in enumerate(valid_questions[:num_examples]):
+    for i, question in enumerate(islice(valid_questions, num_examples)):
         print(f"\nExample {i+1}:")
         print(f"Circuit: {question['circuit_id']}")
         print(f"Question: {question['question']}")
@@ -318,7 +591,7 @@ def show_dataset_examples(qa_dataset: Dict[str, Any], num_examples: int = 3):
         print(f"Measurement: {question['measurement_command']}")
         
                                   
-        netlist_lines = question['circuit_netlist'].split('\n')[:5]
+        netlist_lines = qa_dataset['circuits'][question['circuit_id']]['cleaned'].split('\n')[:5]
         print(f"Circuit (first 5 lines):")
         for line in netlist_lines:
             if line.strip():
@@ -334,10 +607,20 @@ def main():
     parser = argparse.ArgumentParser(description='Create QA Dataset from Circuit Analysis')
     parser.add_argument('--analysis-file', default='synthetic_circuits_robust_analysis_basic_only.json',
                        help='Input circuit analysis JSON file')
-    parser.add_argument('--output-file', default='circuit_qa_dataset.json',
-                       help='Output QA dataset JSON file')
+    parser.add_argument('--output-file', default='circuit_qa_dataset.jsonl',
+                       help='Output QA dataset (JSON Lines, one question per line; metadata in <output-file>.meta.json)')
     parser.add_argument('--max-circuits', type=int, default=None,
                        help='Maximum number of circuits to process')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Concurrent ngspice batches (default: CPU count)')
+    parser.add_argument('--compact', dest='pretty', action='store_false', default=False,
+                       help='Write the metadata JSON without indentation (default)')
+    parser.add_argument('--pretty', dest='pretty', action='store_true',
+                       help='Indent the metadata JSON for reading')
+    parser.add_argument('--gzip', action='store_true',
+                       help='Gzip the questions file (written to <output-file>.gz)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help=f'Re-simulate every circuit instead of reusing answers cached in {SIM_CACHE_DIR}')
     args = parser.parse_args()
     
     if not Path(args.analysis_file).exists():
@@ -350,14 +633,22 @@ def main():
     qa_dataset = create_qa_dataset(
         analysis_file=args.analysis_file,
         output_file=args.output_file,
-        max_circuits=args.max_circuits
+        max_circuits=args.max_circuits,
+        max_workers=args.workers,
+        pretty=args.pretty,
+        compress=args.gzip,
+        use_cache=not args.no_cache
     )
     
                    
+    if not qa_dataset:
+        return
     show_dataset_examples(qa_dataset)
     
     print(f"\nQA dataset creation complete!")
-    print(f"Dataset saved to: {args.output_file}")
+    print(f"Questions saved to: {qa_dataset['questions_file']}")
+    print(f"Metadata saved to: {args.output_file}.meta.json")
+    print(f"Circuit netlists saved to: {qa_dataset['circuits_file']}")
 
 
 
@@ -8,11 +8,19 @@
 import json
 import os
 import shutil
+import sys
 from pathlib import Path
 import re
 import sympy as sp
 from sympy import symbols, Matrix, Eq, solve, simplify, Symbol, Function
 
+# Add repo root to path for imports
+repo_root = Path(__file__).resolve().parent.parent
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from utils.sentinels import SENTINELS  # noqa: E402
+
 
 
 def extract_symbols_from_matrix(matrix_eq):
@@ -444,19 +452,23 @@ def create_individual_equation_question(equation_type):
         return f"What is the {equation_type.lower()} equation for this circuit in the s-domain?"
 
 
+# Substrings marking an error message embedded in a result
+_ERROR_PATTERNS = (
+    "TIMEOUT_OR_ERROR",
+    "MNA Creation Error",
+    "SKIPPED_NO_TRANSFER_FUNCTIONS",
+    "Error:",
+    "unsupported operand type"
+)
+
 def is_valid_data(data, data_type):
 \
 \
        
     if isinstance(data, str):
-        error_patterns = [
-            "TIMEOUT_OR_ERROR",
-            "MNA Creation Error",
-            "SKIPPED_NO_TRANSFER_FUNCTIONS",
-            "Error:",
-            "unsupported operand type"
-        ]
-        for pattern in error_patterns:
+        if data in SENTINELS:
+            return False
+        for pattern in _ERROR_PATTERNS:
             if pattern in data:
                 return False
     return True
@@ -11,16 +11,15 @@ from pathlib import Path
 
 def create_synthetic_dataset():
                         
-    with open('circuit_qa_dataset.json', 'r') as f:
-        data = json.load(f)
+    with open('circuit_qa_dataset.jsonl', 'r') as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    with open('circuit_qa_dataset.jsonl.circuits.json', 'r') as f:
+        circuits = json.load(f)
     
                                               
     dataset_dir = Path('../synthetic_dataset')
     dataset_dir.mkdir(exist_ok=True)
     
-                                          
-    questions = data['questions']
-    
     for i, question_data in enumerate(questions, 1):
                                                   
         question_folder = dataset_dir / f'q{i}'
@@ -43,13 +42,13 @@ def create_synthetic_dataset():
             f.write(str(answer))
         
                              
-        original_netlist = question_data.get('original_netlist', '')
+        original_netlist = circuits.get(circuit_id, {}).get('original', '')
         if original_netlist:
             netlist_file = question_folder / f'q{i}_netlist.txt'
             with open(netlist_file, 'w') as f:
                 f.write(original_netlist)
         else:
-            print(f"WARNING: No original_netlist found for q{i}")
+            print(f"WARNING: No original netlist found for q{i}")
         
                                                
                                                                          
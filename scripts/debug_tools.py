@@ -1,17 +1,22 @@
 """Debug utilities for circuit analysis (internal use only)."""
 
-from lcapy import Circuit, mna
+# Attributes that are already computed (or cheap to compute) once the matrix
+# equations exist; other lcapy/SymPy attributes may trigger symbolic work.
+_CHEAP_ATTRS = ('A', 'G', 'b', 'x', 'unknowns')
 
 
-def debug_mna_object(netlist_string):
+def debug_mna_object(netlist_string, verbose=False):
     """Debug helper to inspect MNA object structure (internal use only).
     
     Args:
         netlist_string: SPICE netlist string
+        verbose: If True, also print the cheap MNA and matrix-equation attributes
     
     Returns:
         Tuple of (matrix_eqs, mna_obj) or (None, None) on failure
     """
+    from lcapy import Circuit, mna
+
     try:
         print("=== DEBUG MNA OBJECT ===")
         circuit = Circuit(netlist_string)
@@ -26,21 +31,24 @@ def debug_mna_object(netlist_string):
         matrix_eqs = mna_obj.matrix_equations()
         print(f"Matrix equations obtained: {type(matrix_eqs)}")
         
-        print(f"\nMNA object attributes:")
-        for attr in sorted(dir(mna_obj)):
-            if not attr.startswith('_'):
+        if verbose:
+            print(f"\nMNA object attributes:")
+            for attr in _CHEAP_ATTRS:
                 try:
                     value = getattr(mna_obj, attr)
                     print(f"  {attr}: {type(value)} = {str(value)[:100]}...")
+                except AttributeError:
+                    continue
                 except:
                     print(f"  {attr}: <access_error>")
-        
-        print(f"\nMatrix equations attributes:")
-        for attr in sorted(dir(matrix_eqs)):
-            if not attr.startswith('_'):
+            
+            print(f"\nMatrix equations attributes:")
+            for attr in _CHEAP_ATTRS:
                 try:
                     value = getattr(matrix_eqs, attr)
                     print(f"  {attr}: {type(value)}")
+                except AttributeError:
+                    continue
                 except:
                     print(f"  {attr}: <access_error>")
         
@@ -1,12 +1,17 @@
-import fitz
 import logging
 import os
+import shutil
 import subprocess
+from functools import lru_cache
 from pathlib import Path
-from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Resolved once per process; None when the engine isn't installed
+PDFLATEX = shutil.which("pdflatex")
+XELATEX = shutil.which("xelatex")
+
+@lru_cache(maxsize=8192)
 def preprocess_latex(latex_code):
     latex_code = latex_code.strip()
     latex_code = latex_code.replace(r"\documentclass{article}", r"\documentclass[border=10pt]{standalone}")
@@ -29,21 +34,27 @@ def pdf2jpg(pdfPath, imgPath, zoom_x, zoom_y, rotation_angle=0, reconvert=False)
     Returns:
         True if successful, False otherwise
     """
+    if os.path.isfile(imgPath) and not reconvert:
+        logger.debug(f"Image file {imgPath} already exists, skipping conversion")
+        return True
+
+    # imported here so LaTeX-only callers don't pay for PyMuPDF
+    import fitz
+
     try:
         pdf = fitz.open(pdfPath)
-        if os.path.exists(imgPath) and not reconvert:
-            logger.debug(f"Image file {imgPath} already exists, skipping conversion")
-            return True
-        assert pdf.page_count > 0, "PDF page count is 0"
-        
-        page = pdf[0]
-        trans = fitz.Matrix(zoom_x, zoom_y).prerotate(rotation_angle)
-        pm = page.get_pixmap(matrix=trans, alpha=False)
-        pm._writeIMG(imgPath, format_="jpg", jpg_quality=100)
-        pdf.close()
-        image = Image.open(imgPath)
-
-        width, height = image.size
+        try:
+            assert pdf.page_count > 0, "PDF page count is 0"
+            
+            page = pdf[0]
+            trans = fitz.Matrix(zoom_x, zoom_y).prerotate(rotation_angle)
+            pm = page.get_pixmap(matrix=trans, alpha=False)
+            pm._writeIMG(imgPath, format_="jpg", jpg_quality=100)
+            # the pixmap already knows the size; no need to decode the JPG again
+            width, height = pm.width, pm.height
+            pm = None
+        finally:
+            pdf.close()
         logger.debug(f"PDF converted to JPG: {imgPath} ({width}x{height})")
         return True
     except Exception as e:
@@ -71,25 +82,32 @@ def compile_latex(folder, file_name, latex_code):
         f.write(latex_code)
     
     # Try pdflatex first
-    try:
-        result = subprocess.run(
-            ["pdflatex", "-interaction=batchmode", f"-output-directory={folder}", str(tex_file)],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode == 0 and pdf_file.exists():
-            logger.debug(f"Successfully compiled LaTeX with pdflatex: {tex_file}")
-            return True
-    except subprocess.TimeoutExpired:
-        logger.warning(f"pdflatex timed out for {tex_file}")
-    except Exception as e:
-        logger.debug(f"pdflatex failed for {tex_file}: {e}")
+    # stdin=DEVNULL with no preexec_fn lets subprocess use posix_spawn instead of fork
+    if PDFLATEX:
+        try:
+            result = subprocess.run(
+                [PDFLATEX, "-interaction=batchmode", f"-output-directory={folder}", str(tex_file)],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            if result.returncode == 0 and pdf_file.exists():
+                logger.debug(f"Successfully compiled LaTeX with pdflatex: {tex_file}")
+                return True
+        except subprocess.TimeoutExpired:
+            logger.warning(f"pdflatex timed out for {tex_file}")
+        except Exception as e:
+            logger.debug(f"pdflatex failed for {tex_file}: {e}")
     
     # Try xelatex as fallback
+    if not XELATEX:
+        logger.error(f"Failed to compile LaTeX: {tex_file} (xelatex not found)")
+        return False
     try:
         result = subprocess.run(
-            ["xelatex", "-interaction=batchmode", f"-output-directory={folder}", str(tex_file)],
+            [XELATEX, "-interaction=batchmode", f"-output-directory={folder}", str(tex_file)],
+            stdin=subprocess.DEVNULL,
             capture_output=True,
             text=True,
             timeout=30
@@ -0,0 +1,44 @@
+"""JSON (de)serialization through the fastest available backend.
+
+Uses orjson when installed, then ujson, then the standard library. ``loads``
+accepts str or bytes and ``dumps`` always returns UTF-8 bytes, so callers can
+read and write files in binary mode whichever backend is active.
+"""
+
+from typing import Any
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        """Serialize obj to JSON bytes, 2-space indented if indent is set."""
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+
+except ImportError:
+    try:
+        import ujson as _json
+
+        BACKEND = "ujson"
+    except ImportError:
+        import json as _json
+
+        BACKEND = "json"
+
+    def loads(data):
+        return _json.loads(data)
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        """Serialize obj to JSON bytes, 2-space indented if indent is set."""
+        if indent:
+            return _json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+        if BACKEND == "json":
+            return _json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return _json.dumps(obj, ensure_ascii=False).encode("utf-8")
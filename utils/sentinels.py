@@ -0,0 +1,12 @@
+"""Placeholder values stored in analysis results instead of a computed result.
+
+``analyze_synthetic_circuits_robust.py`` writes these in place of a transfer
+function or MNA result; downstream scripts use the same set to skip them.
+"""
+
+SENTINELS = frozenset((
+    "TIMEOUT_OR_ERROR",
+    "SKIPPED_TOO_COMPLEX",
+    "SKIPPED_TOO_LARGE",
+    "SKIPPED_NO_TRANSFER_FUNCTIONS",
+))